@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
@@ -5,6 +6,9 @@ from app.models import Base  # adjust import as needed
 
 config = context.config
 fileConfig(config.config_file_name)
+# Migrate the same database the app uses when it is configured through the environment.
+if os.environ.get("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"])
 target_metadata = Base.metadata
 
 def run_migrations_offline():
@@ -0,0 +1,38 @@
+"""add upload_blobs table
+
+Revision ID: a2e5c8f1d374
+Revises: f6a0d3c9e418
+Create Date: 2026-10-19 15:42:09.118306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2e5c8f1d374'
+down_revision: Union[str, Sequence[str], None] = 'f6a0d3c9e418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('upload_blobs',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_upload_blobs_sha256'), 'upload_blobs', ['sha256'], unique=False)
+    # Files uploaded before this revision keep their uuid_filename paths.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_blobs_sha256'), table_name='upload_blobs')
+    op.drop_table('upload_blobs')
@@ -0,0 +1,31 @@
+"""add assignment_file_path and solution_file_path to assignments
+
+Revision ID: a9f4d2c7e5b1
+Revises: e8c3a5f0b9d6
+Create Date: 2026-10-23 10:41:52.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9f4d2c7e5b1'
+down_revision: Union[str, Sequence[str], None] = 'e8c3a5f0b9d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('assignments', sa.Column('assignment_file_path', sa.String(), nullable=True))
+    op.add_column('assignments', sa.Column('solution_file_path', sa.String(), nullable=True))
+    op.execute("UPDATE assignments SET assignment_file_path = file_path WHERE file_path IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('assignments', 'solution_file_path')
+    op.drop_column('assignments', 'assignment_file_path')
@@ -0,0 +1,42 @@
+"""add assignment_tfidf_index table
+
+Revision ID: b4c1e7a9d2f3
+Revises: 720c0436af59
+Create Date: 2026-10-18 09:12:40.512331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c1e7a9d2f3'
+down_revision: Union[str, Sequence[str], None] = '720c0436af59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('assignment_tfidf_index',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('assignment_id', sa.Integer(), nullable=False),
+    sa.Column('vocabulary', sa.Text(), nullable=False),
+    sa.Column('doc_freq', sa.Text(), nullable=False),
+    sa.Column('n_docs', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['assignment_id'], ['assignments.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('assignment_id')
+    )
+    op.create_index(op.f('ix_assignment_tfidf_index_id'), 'assignment_tfidf_index', ['id'], unique=False)
+    # Existing tfidf_vector values are dense per-fit vectors that cannot be reused;
+    # the index is rebuilt lazily on first use or via rebuild_tfidf_index.py.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_assignment_tfidf_index_id'), table_name='assignment_tfidf_index')
+    op.drop_table('assignment_tfidf_index')
@@ -0,0 +1,34 @@
+"""add extracted_texts table
+
+Revision ID: b7d3f9a2c615
+Revises: a2e5c8f1d374
+Create Date: 2026-10-19 17:26:51.402877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3f9a2c615'
+down_revision: Union[str, Sequence[str], None] = 'a2e5c8f1d374'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('extracted_texts',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('extractor_version', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key', 'extractor_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('extracted_texts')
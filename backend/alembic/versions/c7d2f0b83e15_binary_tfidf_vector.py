@@ -0,0 +1,76 @@
+"""store assignment_submissions.tfidf_vector as a compact binary blob
+
+Revision ID: c7d2f0b83e15
+Revises: b4c1e7a9d2f3
+Create Date: 2026-10-18 11:40:03.274918
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import vector_codec
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2f0b83e15'
+down_revision: Union[str, Sequence[str], None] = 'b4c1e7a9d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHUNK_SIZE = 500
+
+
+def _copy_in_chunks(source: str, target: str, convert) -> None:
+    """Convert `source` into `target` CHUNK_SIZE rows at a time, keyed on id."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                f"SELECT id, {source} FROM assignment_submissions "
+                f"WHERE id > :last_id AND {source} IS NOT NULL ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": CHUNK_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text(f"UPDATE assignment_submissions SET {target} = :value WHERE id = :id"),
+            [{"id": row_id, "value": convert(value)} for row_id, value in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _json_to_blob(value):
+    data = json.loads(value)
+    # Dense vectors from before the TF-IDF index used a per-request vocabulary and
+    # cannot be reused; leave them NULL so the index rebuilds them from content.
+    if not isinstance(data, dict):
+        return None
+    return vector_codec.encode(data["indices"], data["counts"])
+
+
+def _blob_to_json(value):
+    indices, values = vector_codec.decode(value)
+    return json.dumps({"indices": indices.tolist(), "counts": [int(v) for v in values]})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('assignment_submissions', sa.Column('tfidf_vector_blob', sa.LargeBinary(), nullable=True))
+    _copy_in_chunks('tfidf_vector', 'tfidf_vector_blob', _json_to_blob)
+    with op.batch_alter_table('assignment_submissions') as batch_op:
+        batch_op.drop_column('tfidf_vector')
+        batch_op.alter_column('tfidf_vector_blob', new_column_name='tfidf_vector')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('assignment_submissions', sa.Column('tfidf_vector_text', sa.Text(), nullable=True))
+    _copy_in_chunks('tfidf_vector', 'tfidf_vector_text', _blob_to_json)
+    with op.batch_alter_table('assignment_submissions') as batch_op:
+        batch_op.drop_column('tfidf_vector')
+        batch_op.alter_column('tfidf_vector_text', new_column_name='tfidf_vector')
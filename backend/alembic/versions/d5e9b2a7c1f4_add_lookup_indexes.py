@@ -0,0 +1,55 @@
+"""add lookup indexes
+
+Revision ID: d5e9b2a7c1f4
+Revises: c4a81e6f2d90
+Create Date: 2026-10-21 10:02:51.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e9b2a7c1f4'
+down_revision: Union[str, Sequence[str], None] = 'c4a81e6f2d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_teacher_subject_teacher_subject', 'teacher_subject', ['teacher_id', 'subject_id'], unique=False)
+    op.create_index('ix_teacher_subject_subject_teacher', 'teacher_subject', ['subject_id', 'teacher_id'], unique=False)
+    op.create_index('ix_student_subject_student_subject', 'student_subject', ['student_id', 'subject_id'], unique=False)
+    op.create_index('ix_student_subject_subject_student', 'student_subject', ['subject_id', 'student_id'], unique=False)
+    op.create_index('ix_users_role_roll_number', 'users', ['role', 'roll_number'], unique=False)
+    op.create_index(op.f('ix_assignments_subject_id'), 'assignments', ['subject_id'], unique=False)
+    op.create_index(op.f('ix_assignments_teacher_id'), 'assignments', ['teacher_id'], unique=False)
+    op.create_index('ix_assignment_submissions_assignment_student', 'assignment_submissions', ['assignment_id', 'student_id'], unique=False)
+    op.create_index(op.f('ix_assignment_submissions_student_id'), 'assignment_submissions', ['student_id'], unique=False)
+    op.create_index('ix_student_subject_status_student_subject', 'student_subject_status', ['student_id', 'subject_id'], unique=False)
+    op.create_index(op.f('ix_student_subject_status_subject_id'), 'student_subject_status', ['subject_id'], unique=False)
+    op.create_index(op.f('ix_grievances_student_id'), 'grievances', ['student_id'], unique=False)
+    op.create_index('ix_messages_conversation', 'messages', ['sender_id', 'receiver_id', 'timestamp'], unique=False)
+    # Give the query planner row counts for the new indexes.
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_conversation', table_name='messages')
+    op.drop_index(op.f('ix_grievances_student_id'), table_name='grievances')
+    op.drop_index(op.f('ix_student_subject_status_subject_id'), table_name='student_subject_status')
+    op.drop_index('ix_student_subject_status_student_subject', table_name='student_subject_status')
+    op.drop_index(op.f('ix_assignment_submissions_student_id'), table_name='assignment_submissions')
+    op.drop_index('ix_assignment_submissions_assignment_student', table_name='assignment_submissions')
+    op.drop_index(op.f('ix_assignments_teacher_id'), table_name='assignments')
+    op.drop_index(op.f('ix_assignments_subject_id'), table_name='assignments')
+    op.drop_index('ix_users_role_roll_number', table_name='users')
+    op.drop_index('ix_student_subject_subject_student', table_name='student_subject')
+    op.drop_index('ix_student_subject_student_subject', table_name='student_subject')
+    op.drop_index('ix_teacher_subject_subject_teacher', table_name='teacher_subject')
+    op.drop_index('ix_teacher_subject_teacher_subject', table_name='teacher_subject')
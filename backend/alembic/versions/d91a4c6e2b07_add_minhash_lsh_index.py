@@ -0,0 +1,50 @@
+"""add submission_minhash and minhash_bands tables
+
+Revision ID: d91a4c6e2b07
+Revises: c7d2f0b83e15
+Create Date: 2026-10-18 14:05:27.903514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a4c6e2b07'
+down_revision: Union[str, Sequence[str], None] = 'c7d2f0b83e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('submission_minhash',
+    sa.Column('submission_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('signature', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['submission_id'], ['assignment_submissions.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+    sa.PrimaryKeyConstraint('submission_id')
+    )
+    op.create_table('minhash_bands',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.Column('submission_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['submission_id'], ['assignment_submissions.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_minhash_bands_bucket_subject', 'minhash_bands', ['bucket', 'subject_id'], unique=False)
+    op.create_index(op.f('ix_minhash_bands_submission_id'), 'minhash_bands', ['submission_id'], unique=False)
+    # Existing submissions are indexed with rebuild_minhash_index.py.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_minhash_bands_submission_id'), table_name='minhash_bands')
+    op.drop_index('ix_minhash_bands_bucket_subject', table_name='minhash_bands')
+    op.drop_table('minhash_bands')
+    op.drop_table('submission_minhash')
@@ -0,0 +1,48 @@
+"""add scoring_jobs table
+
+Revision ID: e3b8a1f05c92
+Revises: d91a4c6e2b07
+Create Date: 2026-10-18 16:22:51.118604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8a1f05c92'
+down_revision: Union[str, Sequence[str], None] = 'd91a4c6e2b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scoring_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('submission_id', sa.Integer(), nullable=False),
+    sa.Column('assignment_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker', sa.String(), nullable=True),
+    sa.Column('detail', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['assignment_id'], ['assignments.id'], ),
+    sa.ForeignKeyConstraint(['submission_id'], ['assignment_submissions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scoring_jobs_id'), 'scoring_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_scoring_jobs_submission_id'), 'scoring_jobs', ['submission_id'], unique=False)
+    op.create_index('ix_scoring_jobs_status_assignment', 'scoring_jobs', ['status', 'assignment_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scoring_jobs_status_assignment', table_name='scoring_jobs')
+    op.drop_index(op.f('ix_scoring_jobs_submission_id'), table_name='scoring_jobs')
+    op.drop_index(op.f('ix_scoring_jobs_id'), table_name='scoring_jobs')
+    op.drop_table('scoring_jobs')
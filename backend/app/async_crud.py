@@ -0,0 +1,58 @@
+"""
+AsyncSession queries for the high-traffic routes that only wait on the database.
+
+Each function takes the request's AsyncSession from app.db.get_async_db and
+awaits its statements, so the event loop serves other requests while the
+driver (aiosqlite / asyncpg) runs the query.
+"""
+from typing import Optional
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas
+
+
+async def get_user(db: AsyncSession, user_id: Optional[int] = None, email: Optional[str] = None):
+    if user_id is not None:
+        statement = select(models.User).where(models.User.id == user_id)
+    else:
+        statement = select(models.User).where(models.User.email == email)
+    return (await db.execute(statement)).scalars().first()
+
+
+async def messages_between(db: AsyncSession, user1_id: int, user2_id: int) -> list[models.Message]:
+    statement = select(models.Message).where(or_(
+        and_(models.Message.sender_id == user1_id, models.Message.receiver_id == user2_id),
+        and_(models.Message.sender_id == user2_id, models.Message.receiver_id == user1_id),
+    )).order_by(models.Message.timestamp.asc())
+    return list((await db.execute(statement)).scalars())
+
+
+async def create_message(db: AsyncSession, message: schemas.MessageCreate) -> models.Message:
+    db_message = models.Message(**message.model_dump())
+    db.add(db_message)
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+
+async def grievances_for_student(db: AsyncSession, student_id: int) -> list[models.Grievance]:
+    statement = select(models.Grievance).where(models.Grievance.student_id == student_id)
+    return list((await db.execute(statement)).scalars())
+
+
+async def create_grievance(db: AsyncSession, grievance: schemas.GrievanceCreate, student_id: int) -> models.Grievance:
+    db_grievance = models.Grievance(**grievance.model_dump(exclude={"student_id"}), student_id=student_id)
+    db.add(db_grievance)
+    await db.commit()
+    await db.refresh(db_grievance)
+    return db_grievance
+
+
+async def noc_statuses(db: AsyncSession, student_id: int) -> list[tuple[int, bool, str]]:
+    """(subject_id, is_noc_eligible, noc_ineligibility_reason) of each of the student's subjects."""
+    statement = select(
+        models.StudentSubjectStatus.subject_id,
+        models.StudentSubjectStatus.is_noc_eligible,
+        models.StudentSubjectStatus.noc_ineligibility_reason,
+    ).where(models.StudentSubjectStatus.student_id == student_id)
+    return [tuple(row) for row in await db.execute(statement)]
@@ -0,0 +1,108 @@
+"""
+Refresh-token sessions.
+
+A login opens a session and hands out an opaque random refresh token; only its
+SHA-256 is stored. Refreshing is one indexed lookup plus a conditional update
+that rotates the token, so renewing an access token never costs a bcrypt
+verification. Presenting a token that was already rotated out means it leaked,
+and revokes its session.
+"""
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+
+class RefreshedSession(NamedTuple):
+    refresh_token: str
+    user_id: int
+    email: str
+    role: models.UserRole
+
+
+def _hash(token: str) -> str:
+    # Refresh tokens are 256 random bits, so a fast hash is enough to keep the table useless to a thief.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create_session(db: Session, user_id: int) -> str:
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(models.AuthSession(
+        user_id=user_id,
+        token_hash=_hash(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+    return refresh_token
+
+
+def rotate(db: Session, refresh_token: str) -> Optional[RefreshedSession]:
+    """Swap a valid refresh token for a new one; None if it is unknown, expired or revoked."""
+    now = datetime.utcnow()
+    token_hash = _hash(refresh_token)
+    row = (
+        db.query(models.AuthSession.id, models.AuthSession.expires_at, models.AuthSession.revoked_at,
+                 models.User.id, models.User.email, models.User.role)
+        .join(models.User, models.User.id == models.AuthSession.user_id)
+        .filter(models.AuthSession.token_hash == token_hash)
+        .first()
+    )
+    if row is None:
+        reused = (
+            db.query(models.AuthSession)
+            .filter(models.AuthSession.previous_token_hash == token_hash, models.AuthSession.revoked_at.is_(None))
+            .update({models.AuthSession.revoked_at: now}, synchronize_session=False)
+        )
+        if reused:
+            db.commit()
+        return None
+
+    session_id, expires_at, revoked_at, user_id, email, role = row
+    if revoked_at is not None or expires_at < now:
+        return None
+
+    new_token = secrets.token_urlsafe(32)
+    # Conditional on the old hash, so of two concurrent refreshes with one token only one wins.
+    rotated = (
+        db.query(models.AuthSession)
+        .filter(models.AuthSession.id == session_id, models.AuthSession.token_hash == token_hash)
+        .update({
+            models.AuthSession.token_hash: _hash(new_token),
+            models.AuthSession.previous_token_hash: token_hash,
+            models.AuthSession.last_used_at: now,
+        }, synchronize_session=False)
+    )
+    db.commit()
+    if not rotated:
+        return None
+    return RefreshedSession(refresh_token=new_token, user_id=user_id, email=email, role=role)
+
+
+def revoke(db: Session, refresh_token: str) -> bool:
+    revoked = (
+        db.query(models.AuthSession)
+        .filter(models.AuthSession.token_hash == _hash(refresh_token), models.AuthSession.revoked_at.is_(None))
+        .update({models.AuthSession.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+    return bool(revoked)
+
+
+def revoke_all(db: Session, user_ids: Optional[list[int]] = None, role: Optional[models.UserRole] = None) -> int:
+    """Revoke every live session of the given users and/or role (all sessions if neither is given)."""
+    query = db.query(models.AuthSession).filter(models.AuthSession.revoked_at.is_(None))
+    if user_ids is not None:
+        query = query.filter(models.AuthSession.user_id.in_(user_ids))
+    if role is not None:
+        query = query.filter(models.AuthSession.user_id.in_(
+            select(models.User.id).where(models.User.role == role)
+        ))
+    revoked = query.update({models.AuthSession.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return revoked
@@ -0,0 +1,245 @@
+"""
+Bulk ingest of offline submissions from a ZIP archive.
+
+Members are decompressed one at a time straight into the upload store, so the
+archive is never unpacked in memory or on disk as a whole. Text extraction for
+each stored file starts on the shared process pool while the rest of the
+archive is still being read; submissions and their scoring jobs are inserted
+BATCH_SIZE at a time once their text is cached, after one plagiarism search over
+the whole batch, and the scoring workers pick them up from there. Progress is reported as a stream of event dicts.
+"""
+import asyncio
+import os
+import time
+import zipfile
+from typing import AsyncIterator, BinaryIO, Optional
+from fastapi import HTTPException
+from app import models, scoring
+from app.db import SessionLocal
+from app.utils import executor, job_queue, text_cache, upload_store
+
+MAX_FILES = 500
+BATCH_SIZE = 50
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+# How long to keep reporting scoring progress before leaving it to the status endpoint.
+PROGRESS_TIMEOUT_S = 600
+PROGRESS_POLL_S = 1.0
+SCORED_STATUSES = ("submitted", "rejected", "error")
+
+
+def roll_number_for(member_name: str, mapping: dict[str, str]) -> str:
+    """The mapped roll number for an archive member, else its file name up to the first "_"."""
+    basename = os.path.basename(member_name)
+    if member_name in mapping:
+        return mapping[member_name]
+    if basename in mapping:
+        return mapping[basename]
+    return os.path.splitext(basename)[0].split("_")[0]
+
+
+def _open_archive(archive: BinaryIO) -> tuple[zipfile.ZipFile, list[zipfile.ZipInfo]]:
+    zf = zipfile.ZipFile(archive)
+    members = [
+        info for info in zf.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+    return zf, members
+
+
+def _students_by_roll_number(roll_numbers: set[str]) -> dict[str, int]:
+    db = SessionLocal()
+    try:
+        rows = db.query(models.User.roll_number, models.User.id).filter(
+            models.User.role == models.UserRole.student,
+            models.User.roll_number.in_(roll_numbers),
+        ).all()
+    finally:
+        db.close()
+    return dict(rows)
+
+
+def _store_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> upload_store.StoredFile:
+    with zf.open(info) as source:
+        tmp_path, sha256, size = upload_store.stream_to_temp(
+            source, upload_store.MAX_UPLOAD_BYTES, upload_store.CHUNK_SIZE
+        )
+    # Committed straight away: the file must be in the store for extraction to start
+    # before its submission is inserted. _release_files drops it if that never happens.
+    db = SessionLocal()
+    try:
+        stored = upload_store.add_reference(db, tmp_path, sha256, size, info.filename)
+        db.commit()
+        return stored
+    finally:
+        db.close()
+
+
+def _release_files(paths: list[str]) -> None:
+    db = SessionLocal()
+    try:
+        for path in paths:
+            upload_store.release(db, path)
+    finally:
+        db.close()
+
+
+def _cached_text(file_path: str) -> Optional[str]:
+    try:
+        return text_cache.get(text_cache.file_key(file_path, os.path.basename(file_path)))
+    except OSError:
+        return None
+
+
+def _insert_batch(assignment_id: int, rows: list[tuple[int, str]]) -> list[int]:
+    """
+    Insert (student_id, file_path) submissions and their scoring jobs in one
+    transaction. The batch is first checked against the assignment's index in a
+    single search; duplicates of indexed work are stored as rejected, with their
+    job already finished and their upload released, instead of each taking a worker.
+    """
+    db = SessionLocal()
+    try:
+        reasons = scoring.screen_batch(db, assignment_id, [_cached_text(file_path) for _, file_path in rows])
+        submissions = [
+            models.AssignmentSubmission(
+                assignment_id=assignment_id, student_id=student_id, content="",
+                file_path=None if reason else file_path, status="rejected" if reason else "scoring",
+            )
+            for (student_id, file_path), reason in zip(rows, reasons)
+        ]
+        db.add_all(submissions)
+        db.flush()
+        for submission, reason in zip(submissions, reasons):
+            job = job_queue.enqueue(db, submission)
+            if reason:
+                job_queue.finish(db, job, detail=reason)
+        db.commit()
+        # As in the scoring worker, rejected uploads are not kept.
+        for (_, file_path), reason in zip(rows, reasons):
+            if reason:
+                upload_store.release(db, file_path)
+        return [submission.id for submission in submissions]
+    finally:
+        db.close()
+
+
+def _status_counts(submission_ids: list[int]) -> dict[str, int]:
+    db = SessionLocal()
+    try:
+        rows = db.query(models.AssignmentSubmission.status).filter(
+            models.AssignmentSubmission.id.in_(submission_ids)
+        ).all()
+    finally:
+        db.close()
+    counts: dict[str, int] = {}
+    for (status,) in rows:
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+async def ingest(assignment_id: int, archive: BinaryIO, mapping: dict[str, str]) -> AsyncIterator[dict]:
+    """
+    Validate the archive and resolve roll numbers up front (raising HTTPException
+    before any response is sent), then return the event stream that stores,
+    extracts and queues every member.
+    """
+    try:
+        zf, members = await executor.run("io", _open_archive, archive)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a ZIP archive.")
+    if len(members) > MAX_FILES:
+        zf.close()
+        raise HTTPException(status_code=400, detail=f"Archive holds {len(members)} files; the limit is {MAX_FILES}.")
+
+    roll_numbers = {info.filename: roll_number_for(info.filename, mapping) for info in members}
+    students = await executor.run("io", _students_by_roll_number, set(roll_numbers.values()))
+    return _events(assignment_id, zf, members, roll_numbers, students)
+
+
+async def _events(
+    assignment_id: int,
+    zf: zipfile.ZipFile,
+    members: list[zipfile.ZipInfo],
+    roll_numbers: dict[str, str],
+    students: dict[str, int],
+) -> AsyncIterator[dict]:
+    started = time.perf_counter()
+    yield {"event": "started", "files": len(members)}
+    # Keep the extract pool busy without overflowing its admission queue.
+    extract_slots = asyncio.Semaphore(executor.TASK_TYPES["extract"].max_concurrency)
+
+    async def warm(path: str) -> None:
+        async with extract_slots:
+            await text_cache.warm(path, os.path.basename(path))
+
+    pending: list[tuple[int, str]] = []
+    warming: list[asyncio.Task] = []
+    submission_ids: list[int] = []
+    skipped = 0
+
+    async def flush() -> dict:
+        await asyncio.gather(*warming)
+        ids = await executor.run("io", _insert_batch, assignment_id, pending)
+        submission_ids.extend(ids)
+        warming.clear()
+        pending.clear()
+        return {"event": "batch", "inserted": len(ids), "total_inserted": len(submission_ids)}
+
+    try:
+        for info in members:
+            roll_number = roll_numbers[info.filename]
+            student_id = students.get(roll_number)
+            reason = None
+            if student_id is None:
+                reason = f"No student with roll number '{roll_number}'"
+            elif not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                reason = "Unsupported file type"
+            elif info.file_size > upload_store.MAX_UPLOAD_BYTES:
+                reason = f"File exceeds the upload limit of {upload_store.MAX_UPLOAD_BYTES} bytes"
+            if reason is None:
+                try:
+                    stored = await executor.run("io", _store_member, zf, info)
+                except HTTPException as e:
+                    reason = e.detail
+                except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                    reason = f"Cannot read archive member: {e}"
+            if reason is not None:
+                skipped += 1
+                yield {"event": "skipped", "file": info.filename, "roll_number": roll_number, "reason": reason}
+                continue
+
+            warming.append(asyncio.create_task(warm(stored.path)))
+            pending.append((student_id, stored.path))
+            yield {"event": "stored", "file": info.filename, "roll_number": roll_number,
+                   "deduplicated": stored.deduplicated}
+            if len(pending) >= BATCH_SIZE:
+                yield await flush()
+        if pending:
+            yield await flush()
+    finally:
+        zf.close()
+        for task in warming:
+            task.cancel()
+        if pending:
+            # Stored but never inserted (a batch failed or the client went away). Run
+            # inline: a cancelled stream cannot await the executor here.
+            _release_files([path for _, path in pending])
+
+    yield {"event": "queued", "submissions": len(submission_ids), "skipped": skipped,
+           "elapsed_s": round(time.perf_counter() - started, 3)}
+
+    deadline = time.perf_counter() + PROGRESS_TIMEOUT_S
+    last_counts = None
+    while submission_ids and time.perf_counter() < deadline:
+        counts = await executor.run("io", _status_counts, submission_ids)
+        if counts != last_counts:
+            scored = sum(counts.get(status, 0) for status in SCORED_STATUSES)
+            yield {"event": "progress", "scored": scored, "total": len(submission_ids), "statuses": counts}
+            if scored == len(submission_ids):
+                break
+            last_counts = counts
+        await asyncio.sleep(PROGRESS_POLL_S)
+
+    yield {"event": "done", "submission_ids": submission_ids,
+           "elapsed_s": round(time.perf_counter() - started, 3)}
@@ -1,17 +1,19 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from app import models
 from app.routers import auth
 from app.schemas import UserCreate
 from app import schemas
+from app.utils import executor
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
     db_user = models.User(
         name=user.name,
         email=user.email,
-        hashed_password=auth.get_password_hash(user.password),  # Hash here
+        hashed_password=hashed_password or auth.get_password_hash(user.password),  # Hash here unless pre-hashed
         role=user.role,
         roll_number=user.roll_number,
         class_name=user.class_name,
@@ -23,8 +25,16 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
-    if not user or not auth.verify_password(password, user.hashed_password):
+async def authenticate_user(db: Session, email: str, password: str):
+    user = await executor.run("io", get_user_by_email, db, email)
+    if not user:
+        await auth.dummy_verify_password()
         return False
+    verified, new_hash = await auth.verify_and_update_password(password, user.hashed_password)
+    if not verified:
+        return False
+    if new_hash:
+        # The stored hash used an outdated cost or scheme; upgrade it now that we know the password.
+        user.hashed_password = new_hash
+        await executor.run("io", db.commit)
     return user
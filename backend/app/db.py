@@ -1,13 +1,207 @@
-from sqlalchemy import create_engine
+"""
+The application's database engine and sessions, configured from the environment.
+
+    DATABASE_URL         sqlite:///./test.db (default) or postgresql+psycopg2://...
+    DB_POOL_SIZE         connections kept open per process
+    DB_MAX_OVERFLOW      extra connections allowed under load
+    DB_POOL_TIMEOUT      seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE      seconds after which a connection is replaced
+    SQLITE_SYNCHRONOUS   NORMAL (default) or FULL
+    SQLITE_MMAP_SIZE     bytes of the database file to memory-map
+    SQLITE_CACHE_KB      page cache per connection, in KiB
+    SQLITE_BUSY_TIMEOUT_MS  how long a writer waits for the lock
+    ASYNC_DATABASE_URL   driver URL for the async engine; derived from DATABASE_URL
+                         (sqlite+aiosqlite / postgresql+asyncpg) when unset
+
+Routes that only wait on the database use the async engine through
+get_async_db, so they hold no threadpool thread while a query runs; the rest
+use the sync engine through get_db. Both share the pool settings above.
+"""
+import os
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./test.db")
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class PoolMetrics:
+    """Connection checkout waits and pool utilization for one engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+
+    def record_wait(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_s_total += waited
+            self.wait_s_max = max(self.wait_s_max, waited)
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self, capacity: int) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": 1000 * self.wait_s_total / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": 1000 * self.wait_s_max,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "capacity": capacity,
+                "utilization": self.checked_out / capacity if capacity else 0.0,
+            }
+
+
+metrics = PoolMetrics()
+async_metrics = PoolMetrics()
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waited for a connection."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started, timed_out=False)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics = metrics
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics = async_metrics
+
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or _async_url(SQLALCHEMY_DATABASE_URL)
+
+
+def _engine_options(url: str, poolclass=TimedQueuePool) -> dict:
+    options = {"pool_pre_ping": True, "pool_recycle": POOL_RECYCLE}
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if make_url(url).database in (None, "", ":memory:"):
+            return options  # in-memory databases keep SQLAlchemy's single-connection pool
+    options.update(
+        poolclass=poolclass,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+    )
+    return options
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool)
 )
 
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; NORMAL sync is durable in WAL mode
+    # except for the last transactions before a power loss.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _track_checkouts(sync_engine, pool_metrics: PoolMetrics) -> None:
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.record_checkout()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_metrics.record_checkin()
+
+
+for _sync_engine, _metrics in ((engine, metrics), (async_engine.sync_engine, async_metrics)):
+    if _sync_engine.dialect.name == "sqlite":
+        event.listen(_sync_engine, "connect", _set_sqlite_pragmas)
+    _track_checkouts(_sync_engine, _metrics)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 Base = declarative_base()
+
+
+def get_db():
+    """FastAPI dependency: one session per request, closed afterwards."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency: one AsyncSession per request, closed afterwards."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _pool_snapshot(pool, pool_metrics: PoolMetrics) -> dict:
+    capacity = POOL_SIZE + MAX_OVERFLOW if isinstance(pool, QueuePool) else 1
+    return {"pool": pool.status(), **pool_metrics.snapshot(capacity)}
+
+
+def pool_metrics() -> dict:
+    return {
+        "dialect": engine.dialect.name,
+        **_pool_snapshot(engine.pool, metrics),
+        "async": _pool_snapshot(async_engine.pool, async_metrics),
+    }
@@ -1,20 +1,99 @@
-from fastapi import Depends, HTTPException, status
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event
 from app.models import User, UserRole
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from app import async_crud
+from app.db import AsyncSessionLocal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# How long a resolved user is trusted before it is re-read from the database.
+PRINCIPAL_TTL_SECONDS = float(os.environ.get("PRINCIPAL_TTL_SECONDS", "60"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user's column values; detached from any session, so safe to share between requests."""
+    id: int
+    name: str
+    email: str
+    role: UserRole
+    roll_number: Optional[str] = None
+    class_name: Optional[str] = None
+    division: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id, name=user.name, email=user.email, role=user.role,
+            roll_number=user.roll_number, class_name=user.class_name, division=user.division,
+        )
+
+
+class PrincipalCache:
+    """In-process TTL cache of principals by user id."""
+
+    def __init__(self, ttl: float = PRINCIPAL_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: dict[int, tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return entry[1]
+
+    def put(self, principal: Principal) -> None:
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Any write to a user row, from any code path in this process, drops its cached principal.
+    principal_cache.invalidate(target.id)
+
+
+async def _load_principal(user_id: Optional[int] = None, email: Optional[str] = None) -> Optional[Principal]:
+    async with AsyncSessionLocal() as db:
+        user = await async_crud.get_user(db, user_id=user_id, email=email)
+        return Principal.from_user(user) if user else None
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Resolve the token's user. Tokens carry the user id and role, so a cached
+    principal answers without touching the database; the result is also kept on
+    request.state, so every dependency of one request shares a single lookup.
+    Being async, authentication never occupies a threadpool thread.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,19 +101,36 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     try:
         payload = jwt.decode(token, "your-secret-key", algorithms=["HS256"])
-        email = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+
+    user_id = payload.get("uid")
+    if user_id is not None:
+        principal = principal_cache.get(user_id)
+        if principal is None:
+            principal = await _load_principal(user_id=user_id)
+            if principal is not None:
+                principal_cache.put(principal)
+        # A token issued before a role change is no longer valid.
+        if principal is None or principal.role != payload.get("role"):
+            raise credentials_exception
+    elif payload.get("sub") is not None:
+        # Tokens issued before the uid/role claims were added
+        principal = await _load_principal(email=payload["sub"])
+        if principal is None:
+            raise credentials_exception
+    else:
         raise credentials_exception
-    return user
+
+    request.state.principal = principal
+    return principal
 
 
+# Cached so every use of the same role shares one checker, which FastAPI then
+# resolves once per request.
+@lru_cache(maxsize=None)
 def require_role(required_role: UserRole):
-    def role_checker(current_user=Depends(get_current_user)):
+    async def role_checker(current_user=Depends(get_current_user)):
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -44,7 +140,11 @@ def require_role(required_role: UserRole):
     return role_checker
 
 def require_roles(required_roles: list[UserRole]):
-    def role_checker(current_user=Depends(get_current_user)):
+    return _require_any_role(tuple(required_roles))
+
+@lru_cache(maxsize=None)
+def _require_any_role(required_roles: tuple[UserRole, ...]):
+    async def role_checker(current_user=Depends(get_current_user)):
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
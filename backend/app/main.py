@@ -1,10 +1,13 @@
+import time
+_started = time.perf_counter()
+
 from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from app.models import Base
-from app.db import engine
+from app import migrations
+from app.db import async_engine
 from app.routers import (
     auth,
     noc,
@@ -16,12 +19,11 @@ from app.routers import (
     marks
 )
 from app.routers.status import router as noc_status_router
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from app.utils import executor
 
 # Initialize FastAPI app
 app = FastAPI()
+logger = logging.getLogger(__name__)
 
 # --- CORS Configuration ---
 # Define the origins (domains) that are allowed to make requests to this backend.
@@ -42,15 +44,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def verify_schema():
+    # Schema changes happen only through `python migrate.py`; refuse to serve a database that is behind or ahead.
+    checked = time.perf_counter()
+    revision = migrations.verify_schema()
+    now = time.perf_counter()
+    logger.info(
+        f"Startup finished in {1000 * (now - _started):.0f} ms "
+        f"(schema check {1000 * (now - checked):.1f} ms, revision {revision})"
+    )
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    executor.shutdown()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
 # --- Exception Handlers ---
-logger = logging.getLogger(__name__)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     logger.warning(f"HTTP error {exc.status_code} at {request.url}: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.detail, "path": str(request.url)}
+        content={"error": exc.detail, "path": str(request.url)},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -0,0 +1,96 @@
+"""
+Schema versioning through Alembic.
+
+The schema is created and changed only by migrations (`python migrate.py`).
+At startup the app just compares the database's alembic_version row with the
+head revision of the migration scripts and refuses to start on a mismatch, so
+workers booting together never race to create tables.
+"""
+import ast
+import glob
+import os
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app.db import SQLALCHEMY_DATABASE_URL, engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config():
+    # Alembic is imported only by the commands that run it, keeping it out of every worker's boot.
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+    return config
+
+
+def _script_revisions() -> dict[str, tuple]:
+    """revision -> down revisions of every script, read without importing the scripts."""
+    revisions = {}
+    for path in glob.glob(os.path.join(BACKEND_DIR, "alembic", "versions", "*.py")):
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        values = {}
+        for node in tree.body:
+            if isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name) and target.id in ("revision", "down_revision"):
+                        values[target.id] = ast.literal_eval(node.value)
+        if "revision" in values:
+            down = values.get("down_revision")
+            revisions[values["revision"]] = tuple(down) if isinstance(down, (list, tuple)) else (down,)
+    return revisions
+
+
+def head_revision() -> Optional[str]:
+    """The newest revision among the migration scripts (read from disk, no database access)."""
+    # Loading Alembic's revision map imports every script; a linear history only needs their headers.
+    revisions = _script_revisions()
+    referenced = {down for downs in revisions.values() for down in downs}
+    heads = [revision for revision in revisions if revision not in referenced]
+    if len(heads) == 1:
+        return heads[0]
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision() -> Optional[str]:
+    """The revision the database is stamped with, or None if it has never been migrated."""
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except (OperationalError, ProgrammingError):
+            return None
+
+
+def verify_schema() -> str:
+    """Raise SchemaOutOfDate unless the database is at the head revision; returns that revision."""
+    head, current = head_revision(), current_revision()
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {current or '<none>'} but the code expects {head}. "
+            f"Run `python migrate.py` from backend/ before starting the app."
+        )
+    return current
+
+
+def upgrade(revision: str = "head") -> None:
+    from alembic import command
+
+    command.upgrade(alembic_config(), revision)
+
+
+def stamp(revision: str) -> None:
+    """Record `revision` without running migrations, for databases created before Alembic."""
+    from alembic import command
+
+    command.stamp(alembic_config(), revision)
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Enum, ForeignKey,
-    Float, DateTime, Table, Boolean, Text
+    Float, DateTime, Table, Boolean, Text, LargeBinary, BigInteger, Index
 )
 from sqlalchemy.orm import relationship, declarative_base
 import enum
@@ -19,6 +19,9 @@ teacher_subject = Table(
     Base.metadata,
     Column("teacher_id", Integer, ForeignKey("users.id")),
     Column("subject_id", Integer, ForeignKey("subjects.id")),
+    # One covering index per lookup direction: a teacher's subjects, a subject's teachers.
+    Index("ix_teacher_subject_teacher_subject", "teacher_id", "subject_id"),
+    Index("ix_teacher_subject_subject_teacher", "subject_id", "teacher_id"),
 )
 
 student_subject = Table(
@@ -26,6 +29,8 @@ student_subject = Table(
     Base.metadata,
     Column("student_id", Integer, ForeignKey("users.id")),
     Column("subject_id", Integer, ForeignKey("subjects.id")),
+    Index("ix_student_subject_student_subject", "student_id", "subject_id"),
+    Index("ix_student_subject_subject_student", "subject_id", "student_id"),
 )
 
 class User(Base):
@@ -51,6 +56,9 @@ class User(Base):
         secondary=student_subject,
         back_populates="registered_students"
     )
+
+    __table_args__ = (Index("ix_users_role_roll_number", "role", "roll_number"),)
+
 class Subject(Base):
     __tablename__ = "subjects"
     id = Column(Integer, primary_key=True, index=True)
@@ -92,12 +100,14 @@ class Assignment(Base):
     __tablename__ = "assignments"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    subject_id = Column(Integer, ForeignKey("subjects.id"))
-    teacher_id = Column(Integer, ForeignKey("users.id"))
+    subject_id = Column(Integer, ForeignKey("subjects.id"), index=True)
+    teacher_id = Column(Integer, ForeignKey("users.id"), index=True)
     description = Column(Text, nullable=True)
     is_sample = Column(Boolean, default=False)
     deadline = Column(DateTime, nullable=False)
     file_path = Column(String, nullable=True)
+    assignment_file_path = Column(String, nullable=True)
+    solution_file_path = Column(String, nullable=True)
     subject = relationship("Subject", back_populates="assignments")
     teacher = relationship("User", foreign_keys=[teacher_id])
 
@@ -105,23 +115,102 @@ class AssignmentSubmission(Base):
     __tablename__ = "assignment_submissions"
     id = Column(Integer, primary_key=True, index=True)
     assignment_id = Column(Integer, ForeignKey("assignments.id"))
-    student_id = Column(Integer, ForeignKey("users.id"))
+    student_id = Column(Integer, ForeignKey("users.id"), index=True)
     content = Column(Text, nullable=False)
     file_path = Column(String, nullable=True)
     deadline_met = Column(Boolean, default=True)
     bert_score = Column(Float, nullable=True)
     marks = Column(Float, nullable=True)
     status = Column(String, default="pending")
-    tfidf_vector = Column(Text, nullable=True) 
+    tfidf_vector = Column(LargeBinary, nullable=True)  # vector_codec-encoded term counts
 
     assignment = relationship("Assignment")
     student = relationship("User")
 
+    __table_args__ = (Index("ix_assignment_submissions_assignment_student", "assignment_id", "student_id"),)
+
+class AssignmentTfidfIndex(Base):
+    __tablename__ = "assignment_tfidf_index"
+    id = Column(Integer, primary_key=True, index=True)
+    assignment_id = Column(Integer, ForeignKey("assignments.id"), unique=True, nullable=False)
+    vocabulary = Column(Text, nullable=False, default="{}")   # JSON term -> column index
+    doc_freq = Column(Text, nullable=False, default="[]")     # JSON list indexed by column
+    n_docs = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    assignment = relationship("Assignment")
+
+class ScoringJob(Base):
+    __tablename__ = "scoring_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    submission_id = Column(Integer, ForeignKey("assignment_submissions.id"), nullable=False, index=True)
+    assignment_id = Column(Integer, ForeignKey("assignments.id"), nullable=False)
+    status = Column(String, default="queued", nullable=False)  # queued, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    worker = Column(String, nullable=True)
+    detail = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    submission = relationship("AssignmentSubmission")
+
+    __table_args__ = (Index("ix_scoring_jobs_status_assignment", "status", "assignment_id"),)
+
+class SubmissionMinHash(Base):
+    __tablename__ = "submission_minhash"
+    submission_id = Column(Integer, ForeignKey("assignment_submissions.id"), primary_key=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
+    signature = Column(LargeBinary, nullable=False)  # uint32 MinHash values
+
+class MinHashBand(Base):
+    __tablename__ = "minhash_bands"
+    id = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, nullable=False)
+    submission_id = Column(Integer, ForeignKey("assignment_submissions.id"), nullable=False, index=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
+
+    __table_args__ = (Index("ix_minhash_bands_bucket_subject", "bucket", "subject_id"),)
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+    key = Column(String(64), primary_key=True)  # sha256 of model name + normalized text
+    model_name = Column(String, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class AuthSession(Base):
+    __tablename__ = "auth_sessions"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)  # sha256 of the current refresh token
+    previous_token_hash = Column(String(64), nullable=True, index=True)  # the token it rotated out
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+
+class ExtractedText(Base):
+    __tablename__ = "extracted_texts"
+    key = Column(String, primary_key=True)  # upload-store key of the source file
+    extractor_version = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class UploadBlob(Base):
+    __tablename__ = "upload_blobs"
+    key = Column(String, primary_key=True)  # sha256 hex + lower-cased file extension
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    refcount = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class StudentSubjectStatus(Base):
     __tablename__ = "student_subject_status"
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False, index=True)
     attendance_percentage = Column(Float, default=0.0)
     cie_completed = Column(Boolean, default=False)
     ha_completed = Column(Boolean, default=False)
@@ -130,16 +219,20 @@ class StudentSubjectStatus(Base):
     sce_presentation_completed = Column(Boolean, default=False)
     sce_certificate_completed = Column(Boolean, default=False)
     sce_pbl_completed = Column(Boolean, default=False)
+    # Maintained by app.noc_eligibility whenever the row or its subject's rules change.
     is_noc_eligible = Column(Boolean, default=False)
+    noc_reason_codes = Column(String, default="")  # comma-separated noc_eligibility.REASON_CODES
     noc_ineligibility_reason = Column(String, default="")
 
     student = relationship("User")
     subject = relationship("Subject")
 
+    __table_args__ = (Index("ix_student_subject_status_student_subject", "student_id", "subject_id"),)
+
 class Grievance(Base):
     __tablename__ = "grievances"
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
@@ -160,6 +253,9 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
 
+    # Serves both directions of a conversation (sender/receiver swapped) in timestamp order.
+    __table_args__ = (Index("ix_messages_conversation", "sender_id", "receiver_id", "timestamp"),)
+
 class Notification(Base):
     __tablename__ = "notifications"
     id = Column(Integer, primary_key=True, index=True)
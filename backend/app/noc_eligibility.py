@@ -0,0 +1,174 @@
+"""
+NOC eligibility rules and their materialized results.
+
+Eligibility of a student for a subject is stored on its StudentSubjectStatus
+row (is_noc_eligible, noc_reason_codes, noc_ineligibility_reason) and kept
+current by the write paths: a marks or attendance change re-evaluates that one
+row, and a change to a subject's has_* flags or attendance_threshold
+re-evaluates the rows of that subject only. Reading NOC status is then a plain
+indexed select. Run rebuild_noc_eligibility.py after changing the rules.
+
+class_evaluation applies the same rules as SQL expressions, evaluating a whole
+class in one joined query for bulk exports.
+"""
+from typing import Iterator, NamedTuple, Optional
+from sqlalchemy import and_, case, false, func, not_, select, union, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from app import models
+
+
+class ComponentRule(NamedTuple):
+    code: str
+    required_flag: str    # Subject column that makes the component mandatory
+    completed_field: str  # StudentSubjectStatus column recording completion
+    message: str
+
+
+ATTENDANCE = "attendance"
+DEFAULT_ATTENDANCE_THRESHOLD = 75
+EXPORT_BATCH_SIZE = 1000
+COMPONENT_RULES = (
+    ComponentRule("cie", "has_cie", "cie_completed", "CIE component incomplete"),
+    ComponentRule("ha", "has_ha", "ha_completed", "HA component incomplete"),
+    ComponentRule("tw", "has_tw", "tw_completed", "TW component incomplete"),
+    ComponentRule("pbl", "has_pbl", "pbl_completed", "PBL component incomplete"),
+    ComponentRule("sce_presentation", "has_sce_presentation", "sce_presentation_completed", "SCE presentation incomplete"),
+    ComponentRule("sce_certificate", "has_sce_certificate", "sce_certificate_completed", "SCE certificate incomplete"),
+    ComponentRule("sce_pbl", "has_sce_pbl", "sce_pbl_completed", "SCE PBL incomplete"),
+)
+REASON_CODES = (ATTENDANCE,) + tuple(rule.code for rule in COMPONENT_RULES)
+# Components completed by recording marks for them: component code -> completion field.
+MARKS_COMPLETION = {rule.code: rule.completed_field for rule in COMPONENT_RULES if rule.code in ("cie", "ha", "tw", "pbl")}
+# Marks a student needs in total across those components for them to count as completed.
+MIN_TOTAL_MARKS = 40
+# Subject and status columns the outcome depends on; a write touching none of them needs no re-evaluation.
+SUBJECT_FIELDS = frozenset(["attendance_threshold"] + [rule.required_flag for rule in COMPONENT_RULES])
+STATUS_FIELDS = frozenset(["attendance_percentage"] + [rule.completed_field for rule in COMPONENT_RULES])
+
+
+class Evaluation(NamedTuple):
+    eligible: bool
+    reason_codes: list[str]
+    reasons: list[str]
+
+
+def evaluate(status: models.StudentSubjectStatus, subject: models.Subject) -> Evaluation:
+    codes, reasons = [], []
+    attendance = status.attendance_percentage or 0.0
+    threshold = subject.attendance_threshold if subject.attendance_threshold is not None else DEFAULT_ATTENDANCE_THRESHOLD
+    if attendance < threshold:
+        codes.append(ATTENDANCE)
+        reasons.append(f"Attendance below threshold ({attendance}%)")
+    for rule in COMPONENT_RULES:
+        if getattr(subject, rule.required_flag) and not getattr(status, rule.completed_field):
+            codes.append(rule.code)
+            reasons.append(rule.message)
+    return Evaluation(eligible=not codes, reason_codes=codes, reasons=reasons)
+
+
+def apply(status: models.StudentSubjectStatus, subject: models.Subject) -> Evaluation:
+    """Evaluate one row and store the outcome on it (flushed with the caller's transaction)."""
+    result = evaluate(status, subject)
+    status.is_noc_eligible = result.eligible
+    status.noc_reason_codes = ",".join(result.reason_codes)
+    status.noc_ineligibility_reason = ", ".join(result.reasons)
+    return result
+
+
+def record_marks(status: models.StudentSubjectStatus, marks: dict[str, Optional[float]]) -> None:
+    """
+    Apply marks ({MARKS_COMPLETION code: marks}) to the completion flags: the
+    components given marks are completed when those marks total at least
+    MIN_TOTAL_MARKS and incomplete otherwise, so lowered marks withdraw an earlier
+    completion. Components without marks (None) keep their flag.
+    """
+    recorded = {code: value for code, value in marks.items() if value is not None}
+    completed = sum(recorded.values()) >= MIN_TOTAL_MARKS
+    for code in recorded:
+        setattr(status, MARKS_COMPLETION[code], completed)
+
+
+def refresh_subject(db: Session, subject: models.Subject) -> int:
+    """Re-evaluate every status row of `subject` whose outcome changed; returns the number updated."""
+    statuses = db.query(models.StudentSubjectStatus).filter(
+        models.StudentSubjectStatus.subject_id == subject.id
+    ).all()
+    changed = []
+    for status in statuses:
+        result = evaluate(status, subject)
+        codes = ",".join(result.reason_codes)
+        if status.is_noc_eligible != result.eligible or status.noc_reason_codes != codes:
+            changed.append({
+                "id": status.id,
+                "is_noc_eligible": result.eligible,
+                "noc_reason_codes": codes,
+                "noc_ineligibility_reason": ", ".join(result.reasons),
+            })
+    if changed:
+        db.execute(update(models.StudentSubjectStatus), changed)
+    return len(changed)
+
+
+def rebuild(db: Session) -> int:
+    """Re-evaluate every status row (after a rules change or for rows written before materialization)."""
+    return sum(refresh_subject(db, subject) for subject in db.query(models.Subject).all())
+
+
+def get_or_create_status(db: Session, student_id: int, subject_id: int) -> models.StudentSubjectStatus:
+    status = (
+        db.query(models.StudentSubjectStatus)
+        .filter_by(student_id=student_id, subject_id=subject_id)
+        .first()
+    )
+    if status is None:
+        status = models.StudentSubjectStatus(
+            student_id=student_id, subject_id=subject_id,
+            attendance_percentage=0.0, noc_reason_codes="", noc_ineligibility_reason="",
+        )
+        for field in STATUS_FIELDS - {"attendance_percentage"}:
+            setattr(status, field, False)
+        db.add(status)
+    return status
+
+
+def sql_reason_flags(status=models.StudentSubjectStatus, subject=models.Subject) -> list:
+    """evaluate() as SQL: one boolean expression per reason code, NULLs read as the column defaults."""
+    flags = [(ATTENDANCE, func.coalesce(status.attendance_percentage, 0.0)
+              < func.coalesce(subject.attendance_threshold, DEFAULT_ATTENDANCE_THRESHOLD))]
+    for rule in COMPONENT_RULES:
+        required = func.coalesce(getattr(subject, rule.required_flag), false())
+        completed = func.coalesce(getattr(status, rule.completed_field), false())
+        flags.append((rule.code, and_(required, not_(completed))))
+    return flags
+
+
+def class_evaluation(db: Session, class_name: str, division: Optional[str] = None) -> Iterator[Row]:
+    """
+    Evaluate every student x subject of a class in one joined query, streamed
+    EXPORT_BATCH_SIZE rows at a time. A student's subjects are those they are
+    registered for or have a status row in; a missing status row counts as
+    nothing completed. Each row carries one boolean column per REASON_CODES entry.
+    """
+    status, subject, user = models.StudentSubjectStatus, models.Subject, models.User
+    pairs = union(
+        select(models.student_subject.c.student_id, models.student_subject.c.subject_id),
+        select(status.student_id, status.subject_id),
+    ).subquery()
+    statement = (
+        select(
+            user.id.label("student_id"), user.roll_number, user.name, user.class_name, user.division,
+            subject.id.label("subject_id"), subject.name.label("subject"),
+            func.coalesce(status.attendance_percentage, 0.0).label("attendance_percentage"),
+            *[case((failed, True), else_=False).label(code) for code, failed in sql_reason_flags(status, subject)],
+        )
+        .select_from(pairs)
+        .join(user, user.id == pairs.c.student_id)
+        .join(subject, subject.id == pairs.c.subject_id)
+        .outerjoin(status, and_(status.student_id == pairs.c.student_id, status.subject_id == pairs.c.subject_id))
+        .where(user.role == models.UserRole.student, user.class_name == class_name,
+               *([user.division == division] if division is not None else []))
+        .order_by(user.roll_number, user.id, subject.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    yield from db.execute(statement)
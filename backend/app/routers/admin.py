@@ -1,18 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from sqlalchemy.orm import Session
-from app import models, schemas, db
+from app import auth_sessions, models, noc_eligibility, schemas
+from app.db import get_db, pool_metrics
 from app.dependencies import require_role, UserRole
+from app.utils import executor
 
 router = APIRouter()
 
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
-
 # List all subjects
 @router.get("/subjects", response_model=List[schemas.SubjectOut], dependencies=[Depends(require_role(UserRole.admin))])
 def list_subjects(db: Session = Depends(get_db)):
@@ -46,6 +41,8 @@ def update_subject(subject_id: int, subject: schemas.SubjectParamsUpdate, db: Se
     update_data = subject.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_subject, key, value)
+    if noc_eligibility.SUBJECT_FIELDS & update_data.keys():
+        noc_eligibility.refresh_subject(db, db_subject)
     db.commit()
     db.refresh(db_subject)
     return db_subject
@@ -64,3 +61,23 @@ def list_students(db: Session = Depends(get_db)):
 @router.get("/users", response_model=List[schemas.UserOut], dependencies=[Depends(require_role(UserRole.admin))])
 def list_users(db: Session = Depends(get_db)):
     return db.query(models.User).all()
+
+# Queue depth, wait and run times of the shared executors
+@router.get("/metrics/executor", dependencies=[Depends(require_role(UserRole.admin))])
+def executor_metrics():
+    return executor.metrics()
+
+# Database connection pool checkout waits and utilization
+@router.get("/metrics/db", dependencies=[Depends(require_role(UserRole.admin))])
+def db_metrics():
+    return pool_metrics()
+
+# Bulk-revoke refresh-token sessions by user and/or role, or every session with "all": true
+@router.post("/sessions/revoke", response_model=schemas.SessionsRevoked, dependencies=[Depends(require_role(UserRole.admin))])
+def revoke_sessions(request: schemas.SessionRevokeRequest, db: Session = Depends(get_db)):
+    if request.user_ids is None and request.role is None and not request.all:
+        raise HTTPException(
+            status_code=422,
+            detail="Give user_ids and/or role, or set all to true to revoke every session."
+        )
+    return {"revoked": auth_sessions.revoke_all(db, user_ids=request.user_ids, role=request.role)}
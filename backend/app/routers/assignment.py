@@ -1,13 +1,16 @@
 from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session, selectinload, joinedload
-from app import models, schemas, db
-from app.dependencies import get_current_user, require_role, UserRole
-from app.utils import bert_utils, tfidf_utils, file_utils
+from app import bulk_submissions, models, schemas
+from app.db import get_db
+from app.dependencies import Principal, get_current_user, require_role, UserRole
+from app.utils import executor, job_queue, text_cache, upload_store
+from email.utils import formatdate, parsedate_to_datetime
+import json
 import os
-import uuid
-import aiofiles
+import zipfile
 
 # ===================================================================
 # Configuration and Helper Functions
@@ -18,21 +21,38 @@ router = APIRouter(
     prefix="/assignments"
 )
 
-UPLOAD_DIR = "backend/uploads/assignments"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Blocking database work for the async endpoints; run through executor.run("io", ...)
+# so it never stalls the event loop.
 
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
+def _get_subject_with_teachers(db: Session, name: str):
+    db_subject = db.query(models.Subject).filter(models.Subject.name == name).first()
+    if not db_subject:
+        return None, []
+    return db_subject, [teacher.id for teacher in db_subject.assigned_teachers]
 
-async def save_upload_file(upload_file: UploadFile, destination: str) -> None:
-    """Asynchronously saves an uploaded file to a destination."""
-    async with aiofiles.open(destination, "wb") as out_file:
-        while content := await upload_file.read(1024):
-            await out_file.write(content)
+def _save(db: Session, instance):
+    db.add(instance)
+    db.commit()
+    db.refresh(instance)
+    return instance
+
+def _save_with_uploads(db: Session, instance, uploads: dict[str, upload_store.StreamedUpload]):
+    """Move streamed uploads into the store and insert the row recording their paths in one transaction."""
+    for column, upload in uploads.items():
+        setattr(instance, column, upload_store.add_reference(db, *upload).path)
+    return _save(db, instance)
+
+def _save_and_enqueue(
+    db: Session, db_sub: models.AssignmentSubmission, upload: Optional[upload_store.StreamedUpload] = None
+) -> models.AssignmentSubmission:
+    if upload:
+        db_sub.file_path = upload_store.add_reference(db, *upload).path
+    db.add(db_sub)
+    db.flush()
+    job_queue.enqueue(db, db_sub)
+    db.commit()
+    db.refresh(db_sub)
+    return db_sub
 
 # ===================================================================
 # Teacher Endpoints
@@ -61,44 +81,46 @@ async def create_assignment(
     assignment_file: Optional[UploadFile] = File(None),
     solution_file: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Creates a new assignment with all details from the frontend form.
     This endpoint is restricted to users with the 'teacher' role.
     """
-    db_subject = db.query(models.Subject).filter(models.Subject.name == subject).first()
+    db_subject, teacher_ids = await executor.run("io", _get_subject_with_teachers, db, subject)
     if not db_subject:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Subject '{subject}' not found")
 
-    if current_user.id not in [teacher.id for teacher in db_subject.assigned_teachers]:
+    if current_user.id not in teacher_ids:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not assigned to teach this subject."
         )
 
-    assignment_file_path, solution_file_path = None, None
-    if assignment_file:
-        filename = f"{uuid.uuid4()}_{assignment_file.filename}"
-        assignment_file_path = os.path.join(UPLOAD_DIR, filename)
-        await save_upload_file(assignment_file, assignment_file_path)
-
-    if solution_file:
-        filename = f"{uuid.uuid4()}_{solution_file.filename}"
-        solution_file_path = os.path.join(UPLOAD_DIR, filename)
-        await save_upload_file(solution_file, solution_file_path)
-
-    db_assignment = models.Assignment(
-        title=title, subject_id=db_subject.id, teacher_id=current_user.id,
-        class_name=class_name, division=division, batch=batch,
-        assignment_type=assignment_type, deadline=due_date, max_marks=max_marks,
-        status=status, description=description, instructions=instructions,
-        is_sample=is_sample,  # **CORRECTED**: Saving the flag to the database
-        assignment_file_path=assignment_file_path, solution_file_path=solution_file_path
-    )
-    db.add(db_assignment)
-    db.commit()
-    db.refresh(db_assignment)
+    # Both files are streamed before any database write, so the write lock is only
+    # held for the short transaction that references them and inserts the row.
+    uploads = {}
+    try:
+        if assignment_file:
+            uploads["assignment_file_path"] = await upload_store.stream_upload(assignment_file)
+
+        if solution_file:
+            uploads["solution_file_path"] = await upload_store.stream_upload(solution_file)
+
+        db_assignment = models.Assignment(
+            title=title, subject_id=db_subject.id, teacher_id=current_user.id,
+            class_name=class_name, division=division, batch=batch,
+            assignment_type=assignment_type, deadline=due_date, max_marks=max_marks,
+            status=status, description=description, instructions=instructions,
+            is_sample=is_sample,  # **CORRECTED**: Saving the flag to the database
+        )
+        db_assignment = await executor.run("io", _save_with_uploads, db, db_assignment, uploads)
+    finally:
+        for upload in uploads.values():
+            upload_store.discard(upload)
+    if is_sample and db_assignment.assignment_file_path:
+        # Every submission to the subject is compared with this sample; parse it once, now.
+        await text_cache.warm(db_assignment.assignment_file_path, assignment_file.filename)
     return db_assignment
 
 @router.get(
@@ -109,7 +131,7 @@ async def create_assignment(
 )
 def get_teacher_assignments(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Retrieves a list of all assignments for the authenticated teacher, including
@@ -153,6 +175,46 @@ def get_teacher_assignments(
         ))
     return response_data
 
+@router.post(
+    "/teacher/{assignment_id}/submissions/bulk",
+    summary="Bulk Upload Offline Submissions",
+    dependencies=[Depends(require_role(UserRole.teacher))]
+)
+async def bulk_upload_submissions(
+    assignment_id: int,
+    archive: UploadFile = File(...),
+    roll_numbers: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Ingests a ZIP archive of submissions collected offline. `roll_numbers` is an
+    optional JSON object mapping archive file names to student roll numbers;
+    unmapped files are matched on their name up to the first "_". Progress is
+    streamed back as newline-delimited JSON events while the files are stored,
+    queued for scoring and scored.
+    """
+    assignment = await executor.run("io", db.query(models.Assignment).get, assignment_id)
+    if not assignment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found")
+    if assignment.teacher_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only upload submissions for your own assignments.")
+
+    mapping = {}
+    if roll_numbers:
+        try:
+            mapping = json.loads(roll_numbers)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="roll_numbers must be a JSON object.")
+        if not isinstance(mapping, dict) or not all(isinstance(v, str) for v in mapping.values()):
+            raise HTTPException(status_code=400, detail="roll_numbers must map file names to roll numbers.")
+
+    events = await bulk_submissions.ingest(assignment_id, archive.file, mapping)
+    return StreamingResponse(
+        (json.dumps(event) + "\n" async for event in events),
+        media_type="application/x-ndjson"
+    )
+
 # ===================================================================
 # Student Endpoints
 # ===================================================================
@@ -168,77 +230,226 @@ async def create_student_submission(
     file: UploadFile = File(...),
     content: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Allows a student to submit a file for a specific assignment.
-    This endpoint includes the fully integrated plagiarism and similarity checks.
+    The file is stored and queued for scoring (text extraction, plagiarism and
+    similarity checks); the submission is returned with status "scoring" and its
+    progress can be followed on the status endpoint.
     """
-    assignment = db.query(models.Assignment).get(assignment_id)
+    assignment = await executor.run("io", db.query(models.Assignment).get, assignment_id)
     if not assignment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found")
 
-    file_path, file_text = None, None
+    upload = None
     if file:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        await save_upload_file(file, file_path)
-        file_text = file_utils.extract_text(file_path, file.filename)
-        if file_text is None:
-            raise HTTPException(status_code=400, detail="Cannot extract text from uploaded file.")
-
-    text_for_check = file_text or content
-    if not text_for_check:
+        upload = await upload_store.stream_upload(file)
+    elif not content:
         raise HTTPException(status_code=400, detail="No content provided for submission.")
 
-    previous_subs = db.query(models.AssignmentSubmission).filter(
-        models.AssignmentSubmission.assignment_id == assignment_id,
-        models.AssignmentSubmission.status == "accepted"
-    ).all()
-    existing_texts = [s.content for s in previous_subs if s.content]
-
-    tfidf_vector_json = None
-    if existing_texts:
-        documents = existing_texts + [text_for_check]
-        vectors, _ = tfidf_utils.compute_tfidf_vectors(documents)
-        new_vec = vectors[-1]
-        similarities = [tfidf_utils.compare_vectors(vectors[i], new_vec) for i in range(len(existing_texts))]
-        if similarities and max(similarities) >= 0.75:
-            raise HTTPException(status_code=400, detail="Potential plagiarism detected. Submission rejected.")
-        tfidf_vector_json = tfidf_utils.vector_to_json(new_vec)
-    else:
-        vec, _ = tfidf_utils.compute_single_tfidf_vector(text_for_check)
-        tfidf_vector_json = tfidf_utils.vector_to_json(vec)
-
-    teacher_sample = db.query(models.Assignment).filter(
-        models.Assignment.subject_id == assignment.subject_id,
-        models.Assignment.is_sample == True,
-    ).first()
-
-    bert_score = 0.0
-    if teacher_sample:
-        sample_text = teacher_sample.description or ""
-        if teacher_sample.assignment_file_path:
-            sample_filename = os.path.basename(teacher_sample.assignment_file_path)
-            extracted_sample_text = file_utils.extract_text(teacher_sample.assignment_file_path, sample_filename)
-            if extracted_sample_text:
-                sample_text = extracted_sample_text
-        
-        if sample_text:
-            bert_score = bert_utils.compute_bert_similarity(text_for_check, sample_text)
-
     db_sub = models.AssignmentSubmission(
         assignment_id=assignment_id,
         student_id=current_user.id,
-        content=text_for_check,
-        file_path=file_path,
-        tfidf_vector=tfidf_vector_json,
-        bert_score=bert_score,
-        status="submitted"
+        content=content or "",
+        status="scoring"
     )
-    db.add(db_sub)
-    db.commit()
-    db.refresh(db_sub)
-    
-    return db_sub
+    try:
+        return await executor.run("io", _save_and_enqueue, db, db_sub, upload)
+    finally:
+        if upload:
+            upload_store.discard(upload)
+
+@router.get(
+    "/student/submissions/{submission_id}/status",
+    summary="Get Scoring Progress of a Submission",
+    response_model=schemas.SubmissionScoringStatus,
+    dependencies=[Depends(require_role(UserRole.student))]
+)
+def get_submission_status(
+    submission_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    submission = db.query(models.AssignmentSubmission).get(submission_id)
+    if not submission or submission.student_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
+
+    job = (
+        db.query(models.ScoringJob)
+        .filter(models.ScoringJob.submission_id == submission_id)
+        .order_by(models.ScoringJob.id.desc())
+        .first()
+    )
+    return schemas.SubmissionScoringStatus(
+        submission_id=submission.id,
+        status=submission.status,
+        job_status=job.status if job else None,
+        queue_position=job_queue.queue_position(db, job) if job else 0,
+        attempts=job.attempts if job else 0,
+        detail=job.detail if job else None,
+        bert_score=submission.bert_score,
+    )
+
+# ===================================================================
+# File Downloads
+# ===================================================================
+
+EXPORT_CHUNK_SIZE = 1024 * 1024
+
+def _can_access_assignment(db: Session, user: Principal, assignment: models.Assignment) -> bool:
+    if user.role == UserRole.admin or assignment.teacher_id == user.id:
+        return True
+    link = models.teacher_subject if user.role == UserRole.teacher else models.student_subject
+    user_column = link.c.teacher_id if user.role == UserRole.teacher else link.c.student_id
+    return db.query(link).filter(user_column == user.id, link.c.subject_id == assignment.subject_id).first() is not None
 
+def _not_modified(request: Request, etag: Optional[str], mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        return etag is not None and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")])
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _file_response(request: Request, path: Optional[str], download_name: str) -> Response:
+    """
+    Serve a stored file. FileResponse answers Range requests and hands the file to
+    the server as a pathsend when the ASGI server supports it; the ETag is the
+    content hash the upload store already named the file by.
+    """
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    stat_result = os.stat(path)
+    sha256 = upload_store.stored_sha256(path)
+    etag = f'"{sha256}"' if sha256 else None
+    headers = {"Last-Modified": formatdate(stat_result.st_mtime, usegmt=True), "Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path, filename=download_name, headers=headers, stat_result=stat_result)
+
+@router.get(
+    "/{assignment_id}/files/{kind}",
+    summary="Download an Assignment or Solution File"
+)
+def download_assignment_file(
+    assignment_id: int,
+    kind: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if kind not in ("assignment", "solution"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown file kind")
+    assignment = db.query(models.Assignment).get(assignment_id)
+    if not assignment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found")
+    if not _can_access_assignment(db, current_user, assignment):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have access to this assignment.")
+    if kind == "solution" and current_user.role == UserRole.student:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solutions are only available to teachers.")
+
+    path = assignment.assignment_file_path if kind == "assignment" else assignment.solution_file_path
+    extension = os.path.splitext(path or "")[1]
+    return _file_response(request, path, f"assignment_{assignment_id}_{kind}{extension}")
+
+@router.get(
+    "/submissions/{submission_id}/file",
+    summary="Download a Submitted File"
+)
+def download_submission_file(
+    submission_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    submission = db.query(models.AssignmentSubmission).get(submission_id)
+    if not submission:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
+    if current_user.role == UserRole.student:
+        allowed = submission.student_id == current_user.id
+    else:
+        allowed = _can_access_assignment(db, current_user, submission.assignment)
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have access to this submission.")
+
+    extension = os.path.splitext(submission.file_path or "")[1]
+    return _file_response(request, submission.file_path, f"submission_{submission_id}{extension}")
+
+class _ZipStream:
+    """Write-only file object that hands zipfile's output back in chunks."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+def _zip_files(files: list[tuple[str, str]]):
+    """
+    Yield a ZIP archive of (archive name, path) pairs as it is written. Entries are
+    stored uncompressed (PDF and DOCX are compressed already), so at most one
+    EXPORT_CHUNK_SIZE chunk is held in memory at a time.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_STORED) as zf:
+        for arcname, path in files:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            with open(path, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                while chunk := src.read(EXPORT_CHUNK_SIZE):
+                    dst.write(chunk)
+                    yield stream.take()
+            yield stream.take()
+    yield stream.take()
+
+@router.get(
+    "/teacher/{assignment_id}/submissions/export",
+    summary="Export All Submitted Files as a ZIP",
+    dependencies=[Depends(require_role(UserRole.teacher))]
+)
+def export_submissions(
+    assignment_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    assignment = db.query(models.Assignment).get(assignment_id)
+    if not assignment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found")
+    if assignment.teacher_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only export your own assignments.")
+
+    rows = (
+        db.query(models.AssignmentSubmission.id, models.AssignmentSubmission.file_path,
+                 models.AssignmentSubmission.student_id, models.User.roll_number)
+        .join(models.User, models.User.id == models.AssignmentSubmission.student_id)
+        .filter(models.AssignmentSubmission.assignment_id == assignment_id,
+                models.AssignmentSubmission.file_path.isnot(None))
+        .order_by(models.AssignmentSubmission.id)
+        .all()
+    )
+    files = [
+        (f"{roll_number or student_id}_{submission_id}{os.path.splitext(file_path)[1]}", file_path)
+        for submission_id, file_path, student_id, roll_number in rows
+        if os.path.isfile(file_path)
+    ]
+    return StreamingResponse(
+        _zip_files(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="assignment_{assignment_id}_submissions.zip"'}
+    )
@@ -5,8 +5,11 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
-from app import schemas, crud, db
-from app.dependencies import require_roles, require_role, UserRole
+import os
+from app import auth_sessions, schemas, crud
+from app.db import get_db
+from app.utils import executor
+from app.dependencies import Principal, get_current_user, require_roles, require_role, UserRole
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -15,15 +18,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 SECRET_KEY = "your-secret-key"  # use env var or secrets manager in prod
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# bcrypt cost factor. Stored hashes with a different cost are rehashed on the
+# next successful login.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -31,6 +30,20 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Async variants for request handlers: bcrypt runs on the dedicated "password"
+# executor pool, whose queue limit turns a login burst into 429s with Retry-After.
+
+async def verify_and_update_password(plain_password, hashed_password) -> tuple[bool, Optional[str]]:
+    """(verified, new hash if the stored one needs_update) as from CryptContext.verify_and_update."""
+    return await executor.run("password", pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def dummy_verify_password() -> None:
+    """Spend one verification's time, so unknown emails can't be told apart by response time."""
+    await executor.run("password", pwd_context.dummy_verify)
+
+async def hash_password(password) -> str:
+    return await executor.run("password", pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -49,31 +62,49 @@ def decode_access_token(token: str) -> Optional[str]:
         return None
 
 @router.post("/signup", response_model=schemas.UserOut)
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await executor.run("io", crud.get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    
-    return crud.create_user(db, user)
+
+    hashed_password = await hash_password(user.password)
+    return await executor.run("io", crud.create_user, db, user, hashed_password)
 
 @router.post("/token", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await crud.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate":"Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role.value})
+    refresh_token = await executor.run("io", auth_sessions.create_session, db, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/token/refresh", response_model=schemas.Token)
+def refresh_access_token(request: schemas.RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new access token and a new refresh token; the old one stops working."""
+    refreshed = auth_sessions.rotate(db, request.refresh_token)
+    if not refreshed:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_access_token(data={"sub": refreshed.email, "uid": refreshed.user_id, "role": refreshed.role.value})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refreshed.refresh_token}
+
+@router.post("/logout", response_model=schemas.SessionsRevoked)
+def logout(request: schemas.RefreshTokenRequest, db: Session = Depends(get_db)):
+    return {"revoked": int(auth_sessions.revoke(db, request.refresh_token))}
+
+@router.post("/sessions/revoke-all", response_model=schemas.SessionsRevoked)
+def revoke_my_sessions(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Sign out everywhere: revoke every refresh token of the current user."""
+    return {"revoked": auth_sessions.revoke_all(db, user_ids=[current_user.id])}
 
 @router.get("/me", response_model=schemas.UserOut)
-def read_users_me(token: str = Security(oauth2_scheme), db: Session = Depends(get_db)):
-    email = decode_access_token(token)
-    if not email:
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    user = crud.get_user_by_email(db, email=email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
+    return current_user
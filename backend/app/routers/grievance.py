@@ -1,37 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app import models, schemas, db
-from app.dependencies import UserRole, require_role, get_current_user
+from app import async_crud, models, schemas
+from app.db import get_async_db, get_db
+from app.dependencies import UserRole, require_role, Principal, get_current_user
 from enum import Enum
 from typing import List, Optional
 
 router = APIRouter()
 
-def get_db():
-    db = db.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class GrievanceStatus(str, Enum):
     pending = "Pending"
     resolved = "Resolved"
     rejected = "Rejected"
 
 @router.post("/grievance", response_model=schemas.GrievanceOut, dependencies=[Depends(require_role(UserRole.student))])
-def submit_grievance(grievance: schemas.GrievanceCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def submit_grievance(grievance: schemas.GrievanceCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user)):
     # Associate grievance to current user
-    db_grievance = models.Grievance(**grievance.model_dump(), student_id=current_user.id)
-    db.add(db_grievance)
-    db.commit()
-    db.refresh(db_grievance)
-    return db_grievance
+    return await async_crud.create_grievance(db, grievance, student_id=current_user.id)
 
 @router.get("/grievance", response_model=List[schemas.GrievanceOut], dependencies=[Depends(require_role(UserRole.student))])
-def get_student_grievances(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    grievances = db.query(models.Grievance).filter(models.Grievance.student_id == current_user.id).all()
-    return grievances
+async def get_student_grievances(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.grievances_for_student(db, current_user.id)
 
 @router.put("/grievance/{grievance_id}/status", dependencies=[Depends(require_role(UserRole.admin))])
 def update_grievance_status(grievance_id: int, status: GrievanceStatus, response: Optional[str] = None, db: Session = Depends(get_db)):
@@ -1,17 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app import models, schemas, db
-from app.dependencies import require_role, get_current_user, UserRole
+from app import models, noc_eligibility, schemas
+from app.db import get_db
+from app.dependencies import require_role, Principal, get_current_user, UserRole
 
 router = APIRouter()
 
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
-
 @router.put(
     "/teacher/update-status",
     status_code=status.HTTP_200_OK,
@@ -19,45 +13,30 @@ def get_db():
 )
 def update_status(
     marks_req: schemas.MarksUpdateRequest,
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     subject = db.query(models.Subject).filter_by(id=marks_req.subject_id).first()
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
-    if current_user not in subject.assigned_teachers:
+    if not db.query(models.teacher_subject).filter(
+        models.teacher_subject.c.teacher_id == current_user.id,
+        models.teacher_subject.c.subject_id == subject.id,
+    ).first():
         raise HTTPException(status_code=403, detail="You are not assigned to this subject")
 
-    status_record = (
-        db.query(models.StudentSubjectStatus)
-        .filter_by(student_id=marks_req.student_id, subject_id=marks_req.subject_id)
-        .first()
-    )
-    if not status_record:
-        status_record = models.StudentSubjectStatus(
-            student_id=marks_req.student_id,
-            subject_id=marks_req.subject_id
-        )
-        db.add(status_record)
+    status_record = noc_eligibility.get_or_create_status(db, marks_req.student_id, marks_req.subject_id)
 
     update_data = marks_req.model_dump(exclude_unset=True)
 
-    # Fields corresponding to checkboxes
-    boolean_fields = [
-        "cie_completed",
-        "ha_completed",
-        "tw_completed",
-        "pbl_completed",
-        "sce_presentation_completed",
-        "sce_certificate_completed",
-        "sce_pbl_completed"
-    ]
-
-    for field in boolean_fields:
-        if field in update_data:
-            setattr(status_record, field, update_data[field])
+    if update_data.get("attendance_percentage") is not None:
+        status_record.attendance_percentage = update_data["attendance_percentage"]
+    noc_eligibility.record_marks(status_record, {
+        code: update_data.get(f"marks_{code}") for code in noc_eligibility.MARKS_COMPLETION
+    })
 
+    noc_eligibility.apply(status_record, subject)
     db.commit()
     db.refresh(status_record)
 
@@ -1,62 +1,110 @@
+import csv
+import io
+import json
+import re
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.dependencies import get_current_user, UserRole, require_role
-from app import models, schemas, db
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import Principal, get_current_user, UserRole, require_role
+from app import async_crud, noc_eligibility, schemas
+from app.db import SessionLocal, get_async_db
 
 router = APIRouter()
 
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
-
 @router.get(
     "/student/noc-status",
     response_model=list[schemas.NocStatusResponse],
     dependencies=[Depends(require_role(UserRole.student))]
 )
-def get_noc_status(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_noc_status(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    status_list = []
-    subscriptions = db.query(models.StudentSubjectStatus).filter_by(student_id=current_user.id).all()
-    for sub_status in subscriptions:
-        reasons = []
-        subject = db.query(models.Subject).filter_by(id=sub_status.subject_id).first()
-        if subject is None:
-            continue
-
-        # Check attendance
-        if sub_status.attendance_percentage < subject.attendance_threshold:
-            reasons.append(f"Attendance below threshold ({sub_status.attendance_percentage}%)")
-
-        # Now check boolean completions, not numeric marks
-        if subject.has_cie and not sub_status.cie_completed:
-            reasons.append("CIE component incomplete")
-        if subject.has_ha and not sub_status.ha_completed:
-            reasons.append("HA component incomplete")
-        if subject.has_tw and not sub_status.tw_completed:
-            reasons.append("TW component incomplete")
-        if subject.has_pbl and not sub_status.pbl_completed:
-            reasons.append("PBL component incomplete")
-
-        # SCE components
-        if subject.has_sce_presentation and not sub_status.sce_presentation_completed:
-            reasons.append("SCE presentation incomplete")
-        if subject.has_sce_certificate and not sub_status.sce_certificate_completed:
-            reasons.append("SCE certificate incomplete")
-        if subject.has_sce_pbl and not sub_status.sce_pbl_completed:
-            reasons.append("SCE PBL incomplete")
-
-        eligible = len(reasons) == 0
-        status_list.append(schemas.NocStatusResponse(
+    # Eligibility is materialized by app.noc_eligibility on every write, so this is a single indexed read.
+    return [
+        schemas.NocStatusResponse(
             student_id=current_user.id,
-            subject_id=sub_status.subject_id,
-            eligible=eligible,
-            reason=None if eligible else ", ".join(reasons)
-        ))
+            subject_id=subject_id,
+            eligible=bool(eligible),
+            reason=None if eligible else reason or None,
+        )
+        for subject_id, eligible, reason in await async_crud.noc_statuses(db, current_user.id)
+    ]
+
+
+EXPORT_COLUMNS = (
+    "student_id", "roll_number", "name", "class_name", "division",
+    "subject_id", "subject", "attendance_percentage", "eligible", "reason_codes",
+)
+
+
+def _export_records(class_name: str, division: Optional[str]):
+    db = SessionLocal()
+    try:
+        for row in noc_eligibility.class_evaluation(db, class_name, division):
+            values = row._mapping
+            codes = [code for code in noc_eligibility.REASON_CODES if values[code]]
+            record = {column: values[column] for column in EXPORT_COLUMNS[:8]}
+            record["eligible"] = not codes
+            record["reason_codes"] = codes
+            yield record
+    finally:
+        db.close()
+
+
+def _csv_chunks(records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # One 0/1 column per reason code besides the combined list, for spreadsheet filtering.
+    writer.writerow(EXPORT_COLUMNS + noc_eligibility.REASON_CODES)
+    for n, record in enumerate(records, 1):
+        codes = record["reason_codes"]
+        writer.writerow(
+            [record[column] for column in EXPORT_COLUMNS[:8]]
+            + [int(record["eligible"]), ";".join(codes)]
+            + [int(code in codes) for code in noc_eligibility.REASON_CODES]
+        )
+        if n % noc_eligibility.EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(records):
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record))
+        if len(lines) == noc_eligibility.EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
 
-    return status_list
+
+@router.get(
+    "/admin/noc-status/export",
+    dependencies=[Depends(require_role(UserRole.admin))]
+)
+def export_class_noc_status(
+    class_name: str,
+    division: Optional[str] = None,
+    format: Literal["csv", "ndjson"] = "csv",
+):
+    """
+    NOC eligibility of every student x subject in a class (optionally one
+    division), evaluated in a single query and streamed as CSV or NDJSON with
+    per-component reason codes.
+    """
+    records = _export_records(class_name, division)
+    label = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{class_name}-{division}" if division else class_name)
+    filename = f"noc-status-{label}.{format}"
+    if format == "csv":
+        chunks, media_type = _csv_chunks(records), "text/csv"
+    else:
+        chunks, media_type = _ndjson_chunks(records), "application/x-ndjson"
+    return StreamingResponse(
+        chunks, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -3,8 +3,9 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 from typing import List
 
-from app import models, schemas, db
-from app.dependencies import get_current_user, require_role, UserRole
+from app import models, schemas
+from app.db import get_db
+from app.dependencies import Principal, get_current_user, require_role, UserRole
 
 # Initialize the router for SCE components
 router = APIRouter(
@@ -13,14 +14,6 @@ router = APIRouter(
     dependencies=[Depends(require_role(UserRole.teacher))]
 )
 
-# Dependency to get a database session
-def get_db():
-    database = db.SessionLocal()
-    try:
-        yield database
-    finally:
-        database.close()
-
 # Helper function to construct the detailed response, avoiding code duplication
 def _construct_sce_detail_response(record: models.StudentSubjectLink) -> schemas.SCEDetailOut:
     """Constructs the SCEDetailOut response model from a database record."""
@@ -68,13 +61,13 @@ def _construct_sce_detail_response(record: models.StudentSubjectLink) -> schemas
 )
 def get_all_sce_data_for_teacher(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Retrieves a comprehensive list of all SCE records for students in the
     subjects assigned to the currently authenticated teacher.
     """
-    teacher_subject_ids = [s.id for s in current_user.assigned_subjects]
+    teacher_subject_ids = [row.subject_id for row in db.query(models.teacher_subject.c.subject_id).filter(models.teacher_subject.c.teacher_id == current_user.id)]
 
     if not teacher_subject_ids:
         return []
@@ -105,7 +98,7 @@ def get_all_sce_data_for_teacher(
 def update_student_sce_status(
     update_request: schemas.SCEStatusUpdateRequest, # Using the new, specific schema
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Updates the status (e.g., 'completed', 'pending', 'late') of SCE
@@ -127,7 +120,10 @@ def update_student_sce_status(
         )
 
     # Verify the teacher is assigned to this subject
-    if record_to_update.subject_id not in [s.id for s in current_user.assigned_subjects]:
+    if not db.query(models.teacher_subject).filter(
+        models.teacher_subject.c.teacher_id == current_user.id,
+        models.teacher_subject.c.subject_id == record_to_update.subject_id,
+    ).first():
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not authorized to update records for this subject."
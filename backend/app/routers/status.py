@@ -1,17 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app import models, schemas, db
+from app import models, noc_eligibility, schemas
+from app.db import get_db
 from app.dependencies import require_role, UserRole
 
 router = APIRouter()
 
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
-
 @router.post(
     "/admin/update-status",
     status_code=status.HTTP_200_OK,
@@ -27,45 +21,18 @@ def update_student_status(
     marks_pbl: float,
     db: Session = Depends(get_db)
 ):
-    # Check or create student-subject status record
-    status = (
-        db.query(models.StudentSubjectStatus)
-        .filter_by(student_id=student_id, subject_id=subject_id)
-        .first()
-    )
-    if not status:
-        status = models.StudentSubjectStatus(
-            student_id=student_id,
-            subject_id=subject_id
-        )
-        db.add(status)
-
-    # Update the record fields
-    status.attendance_percentage = attendance
-    status.marks_cie = marks_cie
-    status.marks_ha = marks_ha
-    status.marks_tw = marks_tw
-    status.marks_pbl = marks_pbl
-
-    # Calculate eligibility based on attendance threshold and marks total
     subject = db.query(models.Subject).get(subject_id)
-    reasons = []
-    if attendance < subject.attendance_threshold:
-        reasons.append(f"Attendance below required threshold ({attendance}%)")
+    if not subject:
+        raise HTTPException(status_code=404, detail="Subject not found")
 
-    total_marks = marks_cie + marks_ha + marks_tw + marks_pbl
-    min_total_marks = 40  # customize this threshold as per your rules
-    if total_marks < min_total_marks:
-        reasons.append("Total marks below required threshold")
+    # Check or create student-subject status record
+    status = noc_eligibility.get_or_create_status(db, student_id, subject_id)
 
-    if reasons:
-        status.is_noc_eligible = False
-        status.noc_ineligibility_reason = "; ".join(reasons)
-    else:
-        status.is_noc_eligible = True
-        status.noc_ineligibility_reason = ""
+    status.attendance_percentage = attendance
+    noc_eligibility.record_marks(status, {"cie": marks_cie, "ha": marks_ha, "tw": marks_tw, "pbl": marks_pbl})
 
+    # Same rules as every other path that touches eligibility
+    result = noc_eligibility.apply(status, subject)
     db.commit()
-    db.refresh(status)
 
-    return {"is_noc_eligible": status.is_noc_eligible, "reason": status.noc_ineligibility_reason}
+    return {"is_noc_eligible": result.eligible, "reason": status.noc_ineligibility_reason}
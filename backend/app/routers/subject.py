@@ -2,17 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.dependencies import require_role
 from app.models import UserRole
-from app import models, schemas, db
+from app import models, noc_eligibility, schemas
+from app.db import get_db
 
 router = APIRouter()
 
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
-
 @router.post(
     "/admin/subjects-create",
     response_model=schemas.SubjectOut,
@@ -44,6 +38,8 @@ def update_subject_parameters(subject_id: int, params: schemas.SubjectParamsUpda
     update_data = params.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(subject, key, value)
+    if noc_eligibility.SUBJECT_FIELDS & update_data.keys():
+        noc_eligibility.refresh_subject(db, subject)
 
     db.commit()
     db.refresh(subject)
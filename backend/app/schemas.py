@@ -36,6 +36,18 @@ class UserOut(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class SessionRevokeRequest(BaseModel):
+    user_ids: Optional[List[int]] = None
+    role: Optional[UserRole] = None
+    all: bool = False  # must be set to revoke every session (neither user_ids nor role given)
+
+class SessionsRevoked(BaseModel):
+    revoked: int
 
 # ===================================================================
 # 2. Subject Schemas
@@ -143,6 +155,15 @@ class AssignmentSubmissionOut(BaseModel):
     class Config:
         from_attributes = True
 
+class SubmissionScoringStatus(BaseModel):
+    submission_id: int
+    status: str
+    job_status: Optional[str] = None
+    queue_position: int = 0
+    attempts: int = 0
+    detail: Optional[str] = None
+    bert_score: Optional[float] = None
+
 class StudentSubmissionDetail(BaseModel):
     id: int
     assignmentId: int = Field(..., alias="assignment_id")
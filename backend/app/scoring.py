@@ -0,0 +1,190 @@
+"""
+Submission scoring pipeline: text extraction, plagiarism checks and BERT scoring.
+
+Runs in the scoring workers (see scoring_worker.py), never in the request path.
+Bulk ingest only calls screen_batch, one TF-IDF search over each batch it queues.
+"""
+import os
+from typing import NamedTuple, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app import models
+from app.utils import bert_utils, tfidf_index, minhash_index, text_cache
+
+PLAGIARISM_THRESHOLD = 0.75
+DUPLICATE_MESSAGE = "Potential plagiarism detected. Submission rejected."
+# Where to look for text reused from other assignments: "subject", "institution" or None.
+CROSS_ASSIGNMENT_SCOPE = "subject"
+
+
+class SubmissionRejected(Exception):
+    """The submission failed a check; the message is shown to the student."""
+
+
+class PlagiarismCheck(NamedTuple):
+    """What check_plagiarism learned about a text, for index_submission."""
+    counts: dict[str, int]
+    signature: Optional[np.ndarray]
+    # Submissions of the same assignment the text was compared with.
+    checked_ids: list[int]
+    # The assignment's index was stale and the check ran against an unsaved rebuild.
+    rebuilt: bool
+
+
+def find_cross_assignment_match(
+    db: Session, new_counts: dict[str, int], candidates: list[minhash_index.Candidate]
+) -> Optional[minhash_index.Candidate]:
+    """Run the exact TF-IDF check against LSH candidates, one assignment index at a time."""
+    by_assignment: dict[int, list[int]] = {}
+    for candidate in candidates:
+        by_assignment.setdefault(candidate.assignment_id, []).append(candidate.submission_id)
+
+    for other_assignment_id, submission_ids in by_assignment.items():
+        other_index = tfidf_index.load_index(db, other_assignment_id)
+        try:
+            ids, vectors = other_index.load_vectors(db, submission_ids=submission_ids)
+        except LookupError:
+            continue  # Not indexed yet; rebuild_tfidf_index.py picks it up.
+        matches = other_index.search([new_counts], ids, vectors, k=1, threshold=PLAGIARISM_THRESHOLD)[0]
+        if matches:
+            return next(c for c in candidates if c.submission_id == matches[0].submission_id)
+    return None
+
+
+def _matches_any(index: tfidf_index.TfidfIndex, counts: dict[str, int], ids: list[int], vectors) -> bool:
+    if not ids:
+        return False
+    return bool(index.search([counts], ids, vectors, threshold=PLAGIARISM_THRESHOLD, early_exit=True)[0])
+
+
+def screen_batch(db: Session, assignment_id: int, texts: list[Optional[str]]) -> list[Optional[str]]:
+    """
+    Check a batch of new texts against an assignment's index in one search and
+    return the rejection message for each, or None to leave it to its scoring job.
+    Texts that are None (not extracted yet) and stale indexes are left to the jobs.
+    """
+    reasons: list[Optional[str]] = [None] * len(texts)
+    present = [i for i, text in enumerate(texts) if text]
+    index = tfidf_index.load_index(db, assignment_id)
+    try:
+        ids, vectors = index.load_vectors(db, status=tfidf_index.INDEXED_STATUS)
+    except LookupError:
+        return reasons
+    if not ids or not present:
+        return reasons
+    documents = [tfidf_index.term_counts(texts[i]) for i in present]
+    for i, matches in zip(present, index.search(documents, ids, vectors, k=1, threshold=PLAGIARISM_THRESHOLD)):
+        if matches:
+            reasons[i] = DUPLICATE_MESSAGE
+    return reasons
+
+
+def check_plagiarism(db: Session, assignment: models.Assignment, text: str) -> PlagiarismCheck:
+    """
+    Compare against this assignment's index and LSH candidates elsewhere. Writes
+    nothing; the returned check is what index_submission needs to add the text.
+    """
+    # Only the new document is tokenized; earlier submissions are read from the index.
+    new_counts = tfidf_index.term_counts(text)
+    index = tfidf_index.load_index(db, assignment.id)
+    rebuilt = False
+    try:
+        previous_ids, previous_vectors = index.load_vectors(db, status=tfidf_index.INDEXED_STATUS)
+    except LookupError:
+        # Submissions predating the index: check against a rebuild held in the
+        # session, which index_submission redoes and saves under the row lock.
+        previous_ids, previous_vectors = index.vectors_of(index.rebuild(db))
+        rebuilt = True
+
+    if _matches_any(index, new_counts, previous_ids, previous_vectors):
+        raise SubmissionRejected(DUPLICATE_MESSAGE)
+
+    new_signature = minhash_index.signature(text)
+    if CROSS_ASSIGNMENT_SCOPE:
+        candidates = minhash_index.find_candidates(
+            db, new_signature,
+            subject_id=assignment.subject_id if CROSS_ASSIGNMENT_SCOPE == "subject" else None,
+            exclude_assignment_id=assignment.id,
+        )
+        if candidates and find_cross_assignment_match(db, new_counts, candidates):
+            raise SubmissionRejected(
+                "Potential plagiarism detected: text matches a submission to another assignment. Submission rejected."
+            )
+    return PlagiarismCheck(new_counts, new_signature, previous_ids, rebuilt)
+
+
+def index_submission(db: Session, submission: models.AssignmentSubmission, check: PlagiarismCheck) -> None:
+    """
+    Add a checked submission to its assignment's TF-IDF index and the MinHash
+    index. Raises SubmissionRejected if it duplicates a submission indexed since
+    the check.
+    """
+    assignment = submission.assignment
+    if check.rebuilt:
+        # Rebuilt again under the row lock to take in submissions indexed since the
+        # check. This one is still "scoring" in the database, so it is added once, below.
+        index = tfidf_index.rebuild_index(db, assignment.id)
+    else:
+        # Re-read the index under a row lock so concurrent submissions don't lose updates.
+        index = tfidf_index.load_index(db, assignment.id, for_update=True)
+    # Jobs of one assignment run in parallel, so the check missed whatever was
+    # indexed since; compare against those now, while no one else can add more.
+    recent_ids = [
+        sub_id for (sub_id,) in db.query(models.AssignmentSubmission.id).filter(
+            models.AssignmentSubmission.assignment_id == assignment.id,
+            models.AssignmentSubmission.status == tfidf_index.INDEXED_STATUS,
+            models.AssignmentSubmission.id.notin_(check.checked_ids),
+        )
+    ]
+    if recent_ids:
+        ids, vectors = index.load_vectors(db, submission_ids=recent_ids)
+        if _matches_any(index, check.counts, ids, vectors):
+            raise SubmissionRejected(DUPLICATE_MESSAGE)
+    index.add(submission, check.counts)
+    minhash_index.add(db, submission, assignment.subject_id, check.signature)
+
+
+def compute_sample_similarity(db: Session, assignment: models.Assignment, text: str) -> float:
+    """BERT similarity between the submission and the subject's teacher sample, if any."""
+    teacher_sample = db.query(models.Assignment).filter(
+        models.Assignment.subject_id == assignment.subject_id,
+        models.Assignment.is_sample == True,
+    ).first()
+
+    bert_score = 0.0
+    if teacher_sample:
+        sample_text = teacher_sample.description or ""
+        if teacher_sample.assignment_file_path:
+            sample_filename = os.path.basename(teacher_sample.assignment_file_path)
+            extracted_sample_text = text_cache.extract_text(teacher_sample.assignment_file_path, sample_filename)
+            if extracted_sample_text:
+                sample_text = extracted_sample_text
+
+        if sample_text:
+            bert_score = bert_utils.compute_bert_similarity(text, sample_text)
+    return bert_score
+
+
+def score_submission(db: Session, submission: models.AssignmentSubmission) -> None:
+    """
+    Fill in content, tfidf_vector and bert_score and move the submission out of
+    "scoring" to "submitted". Raises SubmissionRejected if a check fails.
+    """
+    text = submission.content
+    if submission.file_path:
+        file_text = text_cache.extract_text(submission.file_path, os.path.basename(submission.file_path))
+        if file_text is None:
+            raise SubmissionRejected("Cannot extract text from uploaded file.")
+        text = file_text or text
+    if not text:
+        raise SubmissionRejected("No content provided for submission.")
+
+    submission.content = text
+    # The checks and BERT inference only read; with autoflush off nothing is written
+    # until index_submission, so the job holds the write lock (and the index row
+    # lock) for the index updates alone instead of for the whole model run.
+    with db.no_autoflush:
+        check = check_plagiarism(db, submission.assignment, text)
+        submission.bert_score = compute_sample_similarity(db, submission.assignment, text)
+    index_submission(db, submission, check)
+    submission.status = tfidf_index.INDEXED_STATUS
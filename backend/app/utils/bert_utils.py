@@ -1,25 +1,249 @@
-from transformers import AutoTokenizer, AutoModel
-import torch
-import torch.nn.functional as F
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Iterator
+import numpy as np
+from app.utils import embedding_cache
+from app.utils.embedding_batcher import EmbeddingBatcher
+
+if TYPE_CHECKING:
+    import torch
+
+logger = logging.getLogger(__name__)
 
 # Use a lightweight model for sentence embeddings
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Directory holding a pre-bundled copy of the model (see bundle_model.py). When it
+# exists the weights are memory-mapped from its safetensors file and the Hugging
+# Face hub is never contacted.
+MODEL_DIR = os.environ.get("BERT_MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "models", "all-MiniLM-L6-v2"))
+# Opt-in "int8" dynamic quantization for CPU-only scoring nodes.
+QUANTIZE = os.environ.get("BERT_QUANTIZE") or None
+# Embeddings from a quantized model differ slightly, so they are cached under their own key.
+MODEL_KEY = f"{MODEL_NAME}+{QUANTIZE}" if QUANTIZE else MODEL_NAME
+# Seconds allowed for importing torch/transformers plus loading the model.
+COLD_START_BUDGET_S = float(os.environ.get("BERT_COLD_START_BUDGET_S", "10"))
+
+# Long-document mode: texts longer than SHORT_TEXT_CHARS are embedded as overlapping
+# token windows pooled into one vector instead of being truncated at 512 tokens.
+LONG_DOC_MODE = os.environ.get("BERT_LONG_DOC_MODE", "1") == "1"
+SHORT_TEXT_CHARS = 1000
+WINDOW_TOKENS = int(os.environ.get("BERT_WINDOW_TOKENS", "510"))  # excludes [CLS]/[SEP]
+WINDOW_OVERLAP = int(os.environ.get("BERT_WINDOW_OVERLAP", "128"))
+MAX_WINDOWS = int(os.environ.get("BERT_MAX_WINDOWS", "64"))
+WINDOW_BATCH_SIZE = 8
+LONG_DOC_POOLING = os.environ.get("BERT_LONG_DOC_POOLING", "mean")  # "mean" or "attention"
+ATTENTION_TEMPERATURE = 0.1
+# Text is tokenized incrementally in blocks of about this many characters.
+TOKENIZE_BLOCK_CHARS = 8000
+
+# Populated by get_model(): {"import_s", "load_s", "source", "precision"}
+load_timings: dict = {}
+
+_tokenizer = None
+_model = None
+_load_lock = threading.Lock()
+
+def load_model(quantize=QUANTIZE):
+    """
+    Import torch/transformers and load (tokenizer, model, timings). With
+    quantize="int8" every Linear layer is dynamically quantized to int8 for
+    faster CPU inference; see benchmarks/bench_quantization.py for the cost in
+    score drift.
+    """
+    started = time.perf_counter()
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+    imported = time.perf_counter()
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModel.from_pretrained(MODEL_NAME)
+    if os.path.isdir(MODEL_DIR):
+        source = os.path.abspath(MODEL_DIR)
+        tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=True)
+        model = AutoModel.from_pretrained(source, local_files_only=True, use_safetensors=True)
+    else:
+        source = MODEL_NAME
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        model = AutoModel.from_pretrained(MODEL_NAME)
+    model.eval()
+    if quantize == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif quantize:
+        raise ValueError(f"Unsupported quantization mode {quantize!r}")
+    loaded = time.perf_counter()
 
-def embed_text(text: str) -> torch.Tensor:
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-    outputs = model(**inputs)
-    # Mean Pooling
-    embeddings = outputs.last_hidden_state.mean(dim=1)
+    timings = {
+        "import_s": imported - started, "load_s": loaded - imported,
+        "source": source, "precision": quantize or "fp32",
+    }
+    return tokenizer, model, timings
+
+def get_model():
+    """Return (tokenizer, model), importing torch/transformers and loading the model on first use."""
+    global _tokenizer, _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                tokenizer, model, timings = load_model()
+                load_timings.update(timings)
+                total = timings["import_s"] + timings["load_s"]
+                if total > COLD_START_BUDGET_S:
+                    logger.warning(f"BERT cold start took {total:.2f}s (budget {COLD_START_BUDGET_S}s): {load_timings}")
+                else:
+                    logger.info(f"BERT model ready in {total:.2f}s: {load_timings}")
+                _tokenizer = tokenizer
+                _model = model
+    return _tokenizer, _model
+
+def warm() -> dict:
+    """Load the model and run one forward pass so the first real request pays no setup cost."""
+    embed_text("warm up")
+    return load_timings
+
+def _mean_pool(last_hidden_state: "torch.Tensor", attention_mask: "torch.Tensor") -> "torch.Tensor":
+    # Mean Pooling over real tokens only, so padding doesn't dilute shorter texts
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    return (last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+
+def embed_batch(texts: list[str], loaded=None) -> "torch.Tensor":
+    """Embed several texts in one padded forward pass, with `loaded` (tokenizer, model) or the shared model."""
+    import torch
+    import torch.nn.functional as F
+    tokenizer, model = loaded or get_model()
+    inputs = tokenizer(texts, return_tensors="pt", truncation=True, max_length=512, padding=True)
+    with torch.inference_mode():
+        outputs = model(**inputs)
+    embeddings = _mean_pool(outputs.last_hidden_state, inputs["attention_mask"])
     # Normalize
     return F.normalize(embeddings, p=2, dim=1)
 
-def cosine_similarity(vec1: torch.Tensor, vec2: torch.Tensor) -> float:
+def _text_blocks(text: str, size: int = TOKENIZE_BLOCK_CHARS) -> Iterator[str]:
+    """Split text into blocks of about `size` characters, cutting at whitespace."""
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start, end)
+            if cut > start:
+                end = cut
+        yield text[start:end]
+        start = end
+
+def iter_token_windows(
+    text: str,
+    window_tokens: int = WINDOW_TOKENS,
+    overlap: int = WINDOW_OVERLAP,
+    max_windows: int = MAX_WINDOWS,
+) -> Iterator[list[int]]:
+    """
+    Yield overlapping windows of token ids. The text is tokenized block by block,
+    so only about one window plus one block of tokens is held at a time, and
+    tokenization stops once max_windows windows have been produced.
+    """
+    if not 0 <= overlap < window_tokens:
+        raise ValueError("overlap must be smaller than the window size")
+    tokenizer, _ = get_model()
+    step = window_tokens - overlap
+    buffer: list[int] = []
+    emitted = 0
+    for block in _text_blocks(text):
+        buffer.extend(tokenizer(block, add_special_tokens=False)["input_ids"])
+        while len(buffer) >= window_tokens:
+            yield buffer[:window_tokens]
+            emitted += 1
+            if emitted >= max_windows:
+                return
+            del buffer[:step]
+    # The remainder holds `overlap` tokens already seen plus any new ones.
+    if buffer and (emitted == 0 or len(buffer) > overlap):
+        yield buffer
+
+def _embed_windows(windows: list[list[int]]) -> np.ndarray:
+    import torch
+    import torch.nn.functional as F
+    tokenizer, model = get_model()
+    encoded = tokenizer.pad(
+        {"input_ids": [[tokenizer.cls_token_id, *window, tokenizer.sep_token_id] for window in windows]},
+        padding=True, return_tensors="pt",
+    )
+    with torch.inference_mode():
+        outputs = model(input_ids=encoded["input_ids"], attention_mask=encoded["attention_mask"])
+    embeddings = _mean_pool(outputs.last_hidden_state, encoded["attention_mask"])
+    return F.normalize(embeddings, p=2, dim=1).numpy()
+
+def embed_long_text(text: str, pooling: str = LONG_DOC_POOLING) -> np.ndarray:
+    """
+    Embed a document of any length by pooling its window embeddings.
+
+    "mean" weights each window by its token count and keeps only a running sum.
+    "attention" weights windows by softmax similarity to the document centroid,
+    which favours the dominant topic over outlying sections (cover pages,
+    references); it keeps one vector per window, bounded by MAX_WINDOWS.
+    """
+    if pooling not in ("mean", "attention"):
+        raise ValueError(f"Unknown pooling {pooling!r}")
+    total, weight = None, 0
+    kept = []
+    batch: list[list[int]] = []
+
+    def flush():
+        nonlocal total, weight
+        vectors = _embed_windows(batch)
+        if pooling == "mean":
+            lengths = np.array([len(window) for window in batch], dtype=np.float32)
+            weighted = (vectors * lengths[:, None]).sum(axis=0)
+            total = weighted if total is None else total + weighted
+            weight += lengths.sum()
+        else:
+            kept.append(vectors)
+        batch.clear()
+
+    for window in iter_token_windows(text):
+        batch.append(window)
+        if len(batch) == WINDOW_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    if pooling == "mean":
+        if total is None:
+            return embed_batch([text])[0].numpy()
+        pooled = total / weight
+    else:
+        if not kept:
+            return embed_batch([text])[0].numpy()
+        vectors = np.concatenate(kept)
+        scores = vectors @ vectors.mean(axis=0) / ATTENTION_TEMPERATURE
+        weights = np.exp(scores - scores.max())
+        pooled = (weights / weights.sum()) @ vectors
+    return (pooled / np.linalg.norm(pooled)).astype(np.float32)
+
+def embed_text(text: str) -> "torch.Tensor":
+    return embed_batch([text])
+
+batcher = EmbeddingBatcher(lambda texts: embed_batch(texts).numpy())
+
+def embed_text_cached(text: str) -> "torch.Tensor":
+    """embed_text behind the content-hash embedding cache."""
+    import torch
+    long_doc = LONG_DOC_MODE and len(text) > SHORT_TEXT_CHARS
+    # Windowed embeddings depend on the window settings, so they are cached separately.
+    cache_model = (
+        f"{MODEL_KEY}|windows={WINDOW_TOKENS}/{WINDOW_OVERLAP}/{MAX_WINDOWS}/{LONG_DOC_POOLING}"
+        if long_doc else MODEL_KEY
+    )
+    key = embedding_cache.text_key(text, cache_model)
+    vector = embedding_cache.cache.get(key)
+    if vector is None:
+        vector = embed_long_text(text) if long_doc else batcher.embed(text)
+        embedding_cache.cache.put(key, vector, cache_model)
+    return torch.from_numpy(vector.copy()).unsqueeze(0)
+
+def cosine_similarity(vec1: "torch.Tensor", vec2: "torch.Tensor") -> float:
+    import torch.nn.functional as F
     return F.cosine_similarity(vec1, vec2).item()
 
 def compute_bert_similarity(text1: str, text2: str) -> float:
-    emb1 = embed_text(text1)
-    emb2 = embed_text(text2)
+    emb1 = embed_text_cached(text1)
+    emb2 = embed_text_cached(text2)
     return cosine_similarity(emb1, emb2)
@@ -0,0 +1,116 @@
+"""
+Micro-batching front end for the sentence-embedding model.
+
+Callers on any thread submit single texts; a background thread collects them for
+up to MAX_WAIT_MS (or until MAX_BATCH_SIZE is reached), runs one padded forward
+pass for the whole batch and hands each caller its own row back.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+import numpy as np
+
+MAX_BATCH_SIZE = int(os.environ.get("BERT_MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.environ.get("BERT_MAX_WAIT_MS", "5"))
+# torch intra-op threads for the forward pass, set process-wide when a scoring
+# worker starts (scoring_worker.run_worker); None keeps torch's default.
+NUM_THREADS = int(os.environ["BERT_NUM_THREADS"]) if os.environ.get("BERT_NUM_THREADS") else None
+
+
+class _Request:
+    __slots__ = ("text", "future", "enqueued")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], np.ndarray],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.wait_s_total = 0.0
+        self.forward_s_total = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._started_at = time.perf_counter()
+                    self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed one text, sharing a forward pass with whatever else arrives meanwhile."""
+        return self.submit(text).result()
+
+    def _collect(self) -> list[_Request]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                vectors = self.embed_batch([request.text for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for request, vector in zip(batch, vectors):
+                request.future.set_result(vector)
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self.wait_s_total += sum(started - request.enqueued for request in batch)
+                self.forward_s_total += finished - started
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            elapsed = time.perf_counter() - self._started_at
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "avg_queue_wait_ms": 1000 * self.wait_s_total / self.requests if self.requests else 0.0,
+                "avg_forward_ms": 1000 * self.forward_s_total / self.batches if self.batches else 0.0,
+                "throughput_per_s": self.requests / elapsed if elapsed > 0 else 0.0,
+            }
@@ -0,0 +1,143 @@
+"""
+Two-level cache for sentence embeddings keyed by content hash and model name.
+
+Level 1 is an in-process LRU bounded by a byte budget; level 2 is the
+`embedding_cache` table of float32 vectors, shared by every worker and kept
+across restarts. A teacher sample is therefore embedded once per model rather
+than once per submission, and rescoring an unchanged submission never runs the
+model.
+
+Writes to the table go through a session of their own. Code that embeds while
+its own session holds a write transaction (a scoring job) wraps that work in
+cache.deferred_writes(), so the rows are stored once the transaction has
+committed instead of waiting on its lock.
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import numpy as np
+from app import models
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = 64 * 1024 * 1024
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def text_key(text: str, model_name: str) -> str:
+    """SHA-256 of the model name and whitespace-normalized text."""
+    normalized = _WHITESPACE_RE.sub(" ", text).strip()
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, max_bytes: int = MAX_BYTES, persist: bool = True):
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # .pending: rows queued by deferred_writes()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.persist:
+            db = SessionLocal()
+            try:
+                row = db.query(models.EmbeddingCacheEntry.vector).filter(
+                    models.EmbeddingCacheEntry.key == key
+                ).first()
+            finally:
+                db.close()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype="<f4")
+                self._remember(key, vector)
+                with self._lock:
+                    self.db_hits += 1
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, vector: np.ndarray, model_name: str) -> None:
+        vector = np.ascontiguousarray(vector, dtype="<f4")
+        self._remember(key, vector)
+        if self.persist:
+            pending = getattr(self._local, "pending", None)
+            if pending is not None:
+                pending.append((key, vector, model_name))
+            else:
+                self._store([(key, vector, model_name)])
+
+    def _store(self, entries: list[tuple[str, np.ndarray, str]]) -> None:
+        if not entries:
+            return
+        db = SessionLocal()
+        try:
+            for key, vector, model_name in entries:
+                db.merge(models.EmbeddingCacheEntry(
+                    key=key, model_name=model_name, dim=vector.shape[0], vector=vector.tobytes()
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+    @contextmanager
+    def deferred_writes(self) -> Iterator[None]:
+        """
+        Hold back this thread's table writes until the block exits, then store them
+        in one transaction. In-process lookups see new entries immediately.
+        """
+        self._local.pending = pending = []
+        try:
+            yield
+        finally:
+            self._local.pending = None
+        try:
+            self._store(pending)
+        except Exception as e:
+            # The work itself has committed; the entries stay in the in-process LRU.
+            logger.warning(f"Could not store {len(pending)} embedding cache entries: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.db_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+cache = EmbeddingCache()
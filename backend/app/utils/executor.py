@@ -0,0 +1,211 @@
+"""
+Shared executors for work that must not run on the event loop.
+
+CPU-bound task types run in a process pool and blocking I/O task types in a
+shared thread pool; task types that need capacity of their own (password
+hashing) get a dedicated thread pool. Each task type has its own concurrency
+limit and wait queue; when
+the queue is full the request is refused with 429 and a Retry-After estimate
+instead of piling up behind the work already admitted. A broken or shut-down
+pool is reported as 503.
+"""
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from fastapi import HTTPException, status
+
+PROCESS_WORKERS = int(os.environ.get("EXECUTOR_PROCESS_WORKERS", os.cpu_count() or 2))
+THREAD_WORKERS = int(os.environ.get("EXECUTOR_THREAD_WORKERS", "32"))
+# bcrypt releases the GIL, so password threads run hashes in parallel.
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", "4"))
+PASSWORD_QUEUE = int(os.environ.get("PASSWORD_QUEUE", "64"))
+
+
+class TaskType:
+    def __init__(self, name: str, pool: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.pool = pool  # "process", "thread" or "dedicated"
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+        self.run_s_total = 0.0
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to drain, from the average run time."""
+        avg_run = self.run_s_total / self.completed if self.completed else 1.0
+        return max(1, math.ceil((self.queued + self.running) * avg_run / self.max_concurrency))
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "pool": self.pool,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": 1000 * self.wait_s_total / finished if finished else 0.0,
+            "max_wait_ms": 1000 * self.wait_s_max,
+            "avg_run_ms": 1000 * self.run_s_total / self.completed if self.completed else 0.0,
+        }
+
+
+TASK_TYPES = {
+    task.name: task for task in (
+        # Text extraction: CPU-bound, one process each. (TF-IDF and BERT scoring
+        # run in the scoring workers, not in the API process.)
+        TaskType("extract", "process", PROCESS_WORKERS, 64),
+        # Blocking database and filesystem calls.
+        TaskType("io", "thread", THREAD_WORKERS, 512),
+        # Password hashing and verification: a login burst queues here instead
+        # of occupying the threads every other request needs.
+        TaskType("password", "dedicated", PASSWORD_WORKERS, PASSWORD_QUEUE),
+    )
+}
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_dedicated_pools: dict[str, ThreadPoolExecutor] = {}
+_shutting_down = False
+_in_pool_worker = False
+
+
+def _mark_pool_worker() -> None:
+    global _in_pool_worker
+    _in_pool_worker = True
+
+
+def in_pool_worker() -> bool:
+    """True inside a process-pool worker, which must not start a pool of its own."""
+    return _in_pool_worker
+
+
+def process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, initializer=_mark_pool_worker)
+    return _process_pool
+
+
+def thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="blocking-io")
+    return _thread_pool
+
+
+def dedicated_pool(task: TaskType) -> ThreadPoolExecutor:
+    pool = _dedicated_pools.get(task.name)
+    if pool is None:
+        pool = _dedicated_pools.setdefault(
+            task.name, ThreadPoolExecutor(max_workers=task.max_concurrency, thread_name_prefix=task.name)
+        )
+    return pool
+
+
+def _unavailable(task: TaskType) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Executor for '{task.name}' tasks is unavailable",
+        headers={"Retry-After": str(task.retry_after())},
+    )
+
+
+async def run(task_type: str, fn: Callable, *args: Any) -> Any:
+    """
+    Run fn(*args) in the pool for `task_type` and await its result. For
+    "process" task types fn and its arguments must be picklable.
+    """
+    task = TASK_TYPES[task_type]
+    if _shutting_down:
+        raise _unavailable(task)
+    if task.running >= task.max_concurrency and task.queued >= task.max_queue:
+        task.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many pending '{task.name}' tasks, try again later",
+            headers={"Retry-After": str(task.retry_after())},
+        )
+
+    enqueued = time.perf_counter()
+    task.queued += 1
+    try:
+        await task.slots.acquire()
+    finally:
+        task.queued -= 1
+    started = time.perf_counter()
+    waited = started - enqueued
+    task.wait_s_total += waited
+    task.wait_s_max = max(task.wait_s_max, waited)
+    task.running += 1
+    try:
+        if task.pool == "process":
+            pool: Executor = process_pool()
+        elif task.pool == "dedicated":
+            pool = dedicated_pool(task)
+        else:
+            pool = thread_pool()
+        result = await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        task.failed += 1
+        _reset_process_pool()
+        raise _unavailable(task)
+    except BaseException:
+        task.failed += 1
+        raise
+    finally:
+        task.running -= 1
+        task.slots.release()
+    task.completed += 1
+    task.run_s_total += time.perf_counter() - started
+    return result
+
+
+def _reset_process_pool() -> None:
+    # A worker died; drop the pool so the next task starts a fresh one.
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def metrics() -> dict:
+    return {
+        "process_workers": PROCESS_WORKERS,
+        "thread_workers": THREAD_WORKERS,
+        "queue_depth": sum(task.queued for task in TASK_TYPES.values()),
+        "tasks": {name: task.stats() for name, task in TASK_TYPES.items()},
+    }
+
+
+def shutdown() -> None:
+    global _shutting_down, _process_pool, _thread_pool
+    _shutting_down = True
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=True, cancel_futures=True)
+        _thread_pool = None
+    for pool in _dedicated_pools.values():
+        pool.shutdown(wait=True, cancel_futures=True)
+    _dedicated_pools.clear()
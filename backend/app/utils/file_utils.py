@@ -1,46 +1,112 @@
-from typing import Optional
+import logging
+import multiprocessing
+import time
+from typing import Iterator, Optional
 from PyPDF2 import PdfReader
 from docx import Document
-import aiofiles
-from fastapi import UploadFile
+from app.utils import executor
 
-async def save_upload_file(upload_file: UploadFile, destination: str) -> None:
-    async with aiofiles.open(destination, "wb") as out_file:
-        while content := await upload_file.read(1024):  # read in chunks asynchronously
-            await out_file.write(content)
+logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
+# Bump whenever extraction output changes; cached text from older versions is ignored.
+EXTRACTOR_VERSION = 1
+
+# Extraction limits: anything beyond them is dropped rather than parsed.
+MAX_PAGES = 500
+MAX_CHARS = 2_000_000
+MAX_SECONDS = 60.0
+
+# PDFs with at least PARALLEL_MIN_PAGES pages are split into page ranges of
+# PAGES_PER_TASK and parsed across the shared process pool.
+PARALLEL_MIN_PAGES = 50
+PAGES_PER_TASK = 25
+
+def iter_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None, deadline: Optional[float] = None) -> Iterator[str]:
+    """Yield the text of pages [start, stop), stopping early once `deadline` (time.time()) passes."""
     try:
         reader = PdfReader(file_path)
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        pages = reader.pages[start:stop]
+        for page in pages:
+            if deadline is not None and time.time() > deadline:
+                logger.warning(f"PDF text extraction stopped at time limit: {file_path}")
+                return
+            yield page.extract_text() or ""
     except Exception as e:
-        print(f"PDF text extraction error: {e}")
-    return text
+        logger.warning(f"PDF text extraction error: {e}")
 
-def extract_text_from_docx(file_path: str) -> str:
-    text = ""
+def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
     try:
         doc = Document(file_path)
         for para in doc.paragraphs:
-            text += para.text + "\n"
+            yield para.text + "\n"
     except Exception as e:
-        print(f"DOCX text extraction error: {e}")
-    return text
+        logger.warning(f"DOCX text extraction error: {e}")
 
-def extract_text(file_path: str, filename: str) -> Optional[str]:
-    if filename.lower().endswith(".pdf"):
-        return extract_text_from_pdf(file_path)
-    elif filename.lower().endswith(".docx"):
-        return extract_text_from_docx(file_path)
-    elif filename.lower().endswith(".txt"):
+def _extract_pdf_range(file_path: str, start: int, stop: int, deadline: float) -> str:
+    return "".join(iter_pdf_pages(file_path, start, stop, deadline))
+
+def _iter_pdf(file_path: str, max_pages: int, deadline: float) -> Iterator[str]:
+    try:
+        page_count = min(len(PdfReader(file_path).pages), max_pages)
+    except Exception as e:
+        logger.warning(f"PDF text extraction error: {e}")
+        return
+    # Daemonic processes (the scoring workers) may not start children of their own,
+    # and pool workers must not nest another pool.
+    if (page_count < PARALLEL_MIN_PAGES or executor.PROCESS_WORKERS < 2
+            or multiprocessing.current_process().daemon or executor.in_pool_worker()):
+        yield from iter_pdf_pages(file_path, 0, page_count, deadline)
+        return
+    # Fan page ranges out across processes; map() yields them back in page order.
+    starts = range(0, page_count, PAGES_PER_TASK)
+    yield from executor.process_pool().map(
+        _extract_pdf_range,
+        [file_path] * len(starts), starts,
+        [min(s + PAGES_PER_TASK, page_count) for s in starts],
+        [deadline] * len(starts),
+    )
+
+def iter_text(
+    file_path: str,
+    filename: str,
+    max_pages: int = MAX_PAGES,
+    max_chars: int = MAX_CHARS,
+    max_seconds: float = MAX_SECONDS,
+) -> Optional[Iterator[str]]:
+    """
+    Stream a document's text as page (PDF), paragraph (DOCX) or file (TXT) chunks,
+    truncated at max_pages pages, max_chars characters or max_seconds of parsing.
+    Returns None for unsupported file types.
+    """
+    lower = filename.lower()
+    deadline = time.time() + max_seconds
+    if lower.endswith(".pdf"):
+        chunks = _iter_pdf(file_path, max_pages, deadline)
+    elif lower.endswith(".docx"):
+        chunks = iter_docx_paragraphs(file_path)
+    elif lower.endswith(".txt"):
         try:
             with open(file_path, encoding="utf-8") as f:
-                return f.read()
+                text = f.read(max_chars)
         except Exception as e:
-            print(f"TXT file read error: {e}")
+            logger.warning(f"TXT file read error: {e}")
             return None
+        chunks = iter([text])
     else:
         # Unsupported file type for automatic extraction
         return None
+    return _limit_chars(chunks, max_chars, deadline)
+
+def _limit_chars(chunks: Iterator[str], max_chars: int, deadline: float) -> Iterator[str]:
+    remaining = max_chars
+    for chunk in chunks:
+        if remaining <= 0 or time.time() > deadline:
+            return
+        yield chunk[:remaining]
+        remaining -= len(chunk)
+
+def extract_text(file_path: str, filename: str) -> Optional[str]:
+    chunks = iter_text(file_path, filename)
+    if chunks is None:
+        return None
+    return "".join(chunks)
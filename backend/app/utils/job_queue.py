@@ -0,0 +1,92 @@
+"""
+Durable scoring job queue backed by the `scoring_jobs` table.
+
+Jobs move queued -> running -> done/failed. Workers claim a job with a
+conditional UPDATE, so two workers can never run the same job. Jobs for the same
+assignment run in parallel; only their TF-IDF index updates are serialized, by
+the index row lock (see scoring.index_submission). Jobs whose worker died are
+re-queued once their lease expires.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, update
+from sqlalchemy.orm import Session
+from app import models
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+MAX_ATTEMPTS = 3
+LEASE_SECONDS = 300
+
+
+def enqueue(db: Session, submission: models.AssignmentSubmission) -> models.ScoringJob:
+    job = models.ScoringJob(
+        submission_id=submission.id, assignment_id=submission.assignment_id, status=QUEUED
+    )
+    db.add(job)
+    return job
+
+
+def claim_next(db: Session, worker: str) -> Optional[models.ScoringJob]:
+    """Atomically mark the oldest runnable job as running and return it (committed)."""
+    candidates = (
+        db.query(models.ScoringJob.id)
+        .filter(models.ScoringJob.status == QUEUED)
+        .order_by(models.ScoringJob.id)
+        .limit(5)
+        .all()
+    )
+    for (job_id,) in candidates:
+        claimed = db.execute(
+            update(models.ScoringJob)
+            .where(models.ScoringJob.id == job_id, models.ScoringJob.status == QUEUED)
+            .values(status=RUNNING, worker=worker, started_at=datetime.utcnow(),
+                    attempts=models.ScoringJob.attempts + 1)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.query(models.ScoringJob).get(job_id)
+    return None
+
+
+def finish(db: Session, job: models.ScoringJob, detail: Optional[str] = None) -> None:
+    job.status = DONE
+    job.detail = detail
+    job.finished_at = datetime.utcnow()
+
+
+def fail(db: Session, job: models.ScoringJob, error: str) -> None:
+    """Re-queue the job for another attempt, or mark it failed once attempts run out."""
+    job.detail = error
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = FAILED
+        job.finished_at = datetime.utcnow()
+    else:
+        job.status = QUEUED
+        job.worker = None
+
+
+def requeue_expired(db: Session) -> int:
+    """Return jobs held by dead workers to the queue; returns how many were re-queued."""
+    cutoff = datetime.utcnow() - timedelta(seconds=LEASE_SECONDS)
+    expired = and_(models.ScoringJob.status == RUNNING, models.ScoringJob.started_at < cutoff)
+    # A job that keeps killing its worker is given up on rather than retried forever.
+    db.execute(
+        update(models.ScoringJob)
+        .where(expired, models.ScoringJob.attempts >= MAX_ATTEMPTS)
+        .values(status=FAILED, detail="Worker lease expired", finished_at=datetime.utcnow())
+    )
+    count = db.execute(
+        update(models.ScoringJob).where(expired).values(status=QUEUED, worker=None)
+    ).rowcount
+    db.commit()
+    return count
+
+
+def queue_position(db: Session, job: models.ScoringJob) -> int:
+    """Number of queued jobs ahead of this one (0 once it is running or finished)."""
+    if job.status != QUEUED:
+        return 0
+    return db.query(models.ScoringJob).filter(
+        models.ScoringJob.status == QUEUED, models.ScoringJob.id < job.id
+    ).count()
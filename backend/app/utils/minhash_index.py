@@ -0,0 +1,176 @@
+"""
+Persisted MinHash signatures and LSH banding index over submission content.
+
+Each submission's normalized word shingles are reduced to a NUM_PERM-value
+MinHash signature. The signature is split into BANDS bands of ROWS values and
+every band is hashed into a bucket stored in `minhash_bands`. Near-duplicate
+candidates are the submissions sharing at least one bucket with a new
+document: an indexed `bucket IN (...)` lookup rather than a corpus scan. With
+32 bands of 4 rows, pairs above a Jaccard similarity of ~0.42 are likely to
+collide.
+"""
+import hashlib
+import re
+from typing import NamedTuple, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
+from app import models
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Candidates whose estimated Jaccard similarity falls below this are dropped
+# before the exact TF-IDF comparison.
+MIN_JACCARD = 0.3
+# rebuild(): assignment ids per IN (...) list (well under SQLite's bound-parameter
+# limit) and submissions held in memory at a time.
+REBUILD_CHUNK_SIZE = 500
+REBUILD_BATCH_SIZE = 1000
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: persisted signatures are only comparable if the permutations never change.
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class Candidate(NamedTuple):
+    submission_id: int
+    assignment_id: int
+    jaccard: float
+
+
+def shingles(text: str) -> set[str]:
+    """Lowercased word n-grams, ignoring punctuation and whitespace differences."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (uint32[NUM_PERM]) of a document, or None if it has no words."""
+    doc_shingles = shingles(text)
+    if not doc_shingles:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in doc_shingles),
+        dtype=np.uint64,
+        count=len(doc_shingles),
+    )
+    # Arithmetic wraps at 64 bits; that is fine for hashing purposes.
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(sig: np.ndarray) -> list[int]:
+    """One signed 64-bit bucket key per band, mixing in the band number."""
+    buckets = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].astype("<u4").tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+def _decode(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def add(db: Session, submission: models.AssignmentSubmission, subject_id: Optional[int], sig: Optional[np.ndarray]) -> None:
+    """Store a submission's signature and its band buckets."""
+    if sig is None:
+        return
+    if submission.id is None:
+        db.flush()
+    db.add(models.SubmissionMinHash(
+        submission_id=submission.id, subject_id=subject_id, signature=sig.astype("<u4").tobytes()
+    ))
+    db.add_all([
+        models.MinHashBand(bucket=bucket, submission_id=submission.id, subject_id=subject_id)
+        for bucket in band_buckets(sig)
+    ])
+
+
+def find_candidates(
+    db: Session,
+    sig: Optional[np.ndarray],
+    subject_id: Optional[int] = None,
+    exclude_assignment_id: Optional[int] = None,
+    min_jaccard: float = MIN_JACCARD,
+) -> list[Candidate]:
+    """
+    Submissions sharing an LSH bucket with `sig`, restricted to one subject when
+    subject_id is given (otherwise institution-wide), best estimate first.
+    """
+    if sig is None:
+        return []
+    query = (
+        db.query(models.SubmissionMinHash.submission_id, models.AssignmentSubmission.assignment_id,
+                 models.SubmissionMinHash.signature)
+        .join(models.AssignmentSubmission, models.AssignmentSubmission.id == models.SubmissionMinHash.submission_id)
+        .filter(models.SubmissionMinHash.submission_id.in_(
+            db.query(models.MinHashBand.submission_id).filter(
+                models.MinHashBand.bucket.in_(band_buckets(sig)),
+                *([models.MinHashBand.subject_id == subject_id] if subject_id is not None else []),
+            )
+        ))
+    )
+    if exclude_assignment_id is not None:
+        query = query.filter(models.AssignmentSubmission.assignment_id != exclude_assignment_id)
+
+    candidates = []
+    for submission_id, assignment_id, blob in query.all():
+        jaccard = estimate_jaccard(sig, _decode(blob))
+        if jaccard >= min_jaccard:
+            candidates.append(Candidate(submission_id, assignment_id, jaccard))
+    return sorted(candidates, key=lambda c: c.jaccard, reverse=True)
+
+
+def _index_assignments(db: Session, assignment_ids: Optional[list[int]]) -> int:
+    """Signature and buckets for every submission of the given assignments (or all), streamed in batches."""
+    submissions = (
+        db.query(models.AssignmentSubmission, models.Assignment.subject_id)
+        .join(models.Assignment, models.Assignment.id == models.AssignmentSubmission.assignment_id)
+        .options(load_only(models.AssignmentSubmission.id, models.AssignmentSubmission.content))
+    )
+    if assignment_ids is not None:
+        submissions = submissions.filter(models.AssignmentSubmission.assignment_id.in_(assignment_ids))
+    count = 0
+    for submission, subject_id in submissions.yield_per(REBUILD_BATCH_SIZE):
+        add(db, submission, subject_id, signature(submission.content or ""))
+        count += 1
+        if count % REBUILD_BATCH_SIZE == 0:
+            db.flush()
+    db.flush()
+    return count
+
+
+def rebuild(db: Session, assignment_ids: Optional[list[int]] = None) -> int:
+    """Recompute signatures and buckets for the given assignments (or all); returns rows indexed."""
+    if assignment_ids is None:
+        db.query(models.MinHashBand).delete(synchronize_session=False)
+        db.query(models.SubmissionMinHash).delete(synchronize_session=False)
+        return _index_assignments(db, None)
+
+    count = 0
+    for start in range(0, len(assignment_ids), REBUILD_CHUNK_SIZE):
+        chunk = assignment_ids[start:start + REBUILD_CHUNK_SIZE]
+        stale = select(models.AssignmentSubmission.id).where(models.AssignmentSubmission.assignment_id.in_(chunk))
+        db.query(models.MinHashBand).filter(models.MinHashBand.submission_id.in_(stale)).delete(synchronize_session=False)
+        db.query(models.SubmissionMinHash).filter(
+            models.SubmissionMinHash.submission_id.in_(stale)
+        ).delete(synchronize_session=False)
+        count += _index_assignments(db, chunk)
+    return count
@@ -0,0 +1,70 @@
+"""
+Batched top-k cosine similarity over sparse, l2-normalized row matrices.
+
+Candidates are scanned in row blocks with one sparse product per block against
+all queries at once, so checking many new documents costs the same number of
+passes over the stored matrix as checking one.
+"""
+from typing import NamedTuple, Optional
+import numpy as np
+from scipy import sparse
+
+# Rows scored per sparse product; bounds the dense score block to BLOCK_ROWS x n_queries.
+BLOCK_ROWS = 4096
+
+
+class Match(NamedTuple):
+    submission_id: int
+    score: float
+
+
+def top_k(
+    candidates: sparse.csr_matrix,
+    candidate_ids: list[int],
+    queries: sparse.csr_matrix,
+    k: int = 5,
+    threshold: Optional[float] = None,
+    early_exit: bool = False,
+    block_rows: int = BLOCK_ROWS,
+) -> list[list[Match]]:
+    """
+    Return, for each query row, up to k best-scoring candidates in descending order.
+
+    Both matrices must already be l2-normalized so the dot product is the cosine.
+    With a threshold only matches scoring at least that much are returned, and
+    early_exit stops scanning as soon as every query has one such match -- enough
+    for an accept/reject decision, though later blocks may hold better matches.
+    """
+    n_queries = queries.shape[0]
+    ids = np.asarray(candidate_ids)
+    best_scores = np.full((n_queries, 0), -np.inf)
+    best_rows = np.empty((n_queries, 0), dtype=np.intp)
+    queries_t = queries.T.tocsc()
+
+    for start in range(0, candidates.shape[0], block_rows):
+        block = candidates[start:start + block_rows]
+        scores = (block @ queries_t).toarray().T  # n_queries x block rows
+        rows = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+
+        scores = np.concatenate([best_scores, scores], axis=1)
+        rows = np.concatenate([best_rows, rows], axis=1)
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, keep, axis=1)
+            rows = np.take_along_axis(rows, keep, axis=1)
+        best_scores, best_rows = scores, rows
+
+        if early_exit and threshold is not None and n_queries and (best_scores.max(axis=1) >= threshold).all():
+            break
+
+    results = []
+    for q in range(n_queries):
+        order = np.argsort(-best_scores[q], kind="stable")
+        matches = []
+        for i in order:
+            score = float(best_scores[q, i])
+            if threshold is not None and score < threshold:
+                break
+            matches.append(Match(int(ids[best_rows[q, i]]), score))
+        results.append(matches)
+    return results
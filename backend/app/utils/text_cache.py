@@ -0,0 +1,111 @@
+"""
+Extracted document text, stored once per file content and extractor version.
+
+Files are identified by their upload-store key (SHA-256 of the content plus the
+extension extraction dispatches on), so a teacher sample is parsed once no
+matter how many submissions are scored against it, and identical uploads share
+one entry. Bumping file_utils.EXTRACTOR_VERSION makes older entries misses.
+
+Like the embedding cache, writes made inside deferred_writes() are held back
+until the block exits, so a scoring job never waits on its own write lock.
+"""
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from app import models
+from app.db import SessionLocal
+from app.utils import executor, file_utils, upload_store
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_local = threading.local()  # .pending: entries queued by deferred_writes()
+
+
+def file_key(file_path: str, filename: str) -> str:
+    sha256 = upload_store.stored_sha256(file_path)  # store files are named by their hash
+    if sha256 is None:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+    return upload_store.blob_key(sha256, filename)
+
+
+def get(key: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        row = db.query(models.ExtractedText.text).filter(
+            models.ExtractedText.key == key,
+            models.ExtractedText.extractor_version == file_utils.EXTRACTOR_VERSION,
+        ).first()
+    finally:
+        db.close()
+    return row[0] if row is not None else None
+
+
+def put(key: str, text: str) -> None:
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending[key] = text
+    else:
+        _store({key: text})
+
+
+def _store(entries: dict[str, str]) -> None:
+    if not entries:
+        return
+    db = SessionLocal()
+    try:
+        for key, text in entries.items():
+            db.merge(models.ExtractedText(key=key, extractor_version=file_utils.EXTRACTOR_VERSION, text=text))
+        db.commit()
+    finally:
+        db.close()
+
+
+@contextmanager
+def deferred_writes() -> Iterator[None]:
+    """Hold back this thread's puts until the block exits, then store them in one transaction."""
+    _local.pending = pending = {}
+    try:
+        yield
+    finally:
+        _local.pending = None
+    try:
+        _store(pending)
+    except Exception as e:
+        logger.warning(f"Could not store {len(pending)} extracted texts: {e}")
+
+
+def extract_text(file_path: str, filename: str) -> Optional[str]:
+    """file_utils.extract_text behind the cache. Unsupported file types (None) are not cached."""
+    try:
+        key = file_key(file_path, filename)
+    except OSError as e:
+        logger.warning(f"Cannot hash {file_path}: {e}")
+        return None
+    text = get(key)
+    if text is None:
+        text = file_utils.extract_text(file_path, filename)
+        if text is not None:
+            put(key, text)
+    return text
+
+
+async def warm(file_path: str, filename: str) -> None:
+    """Extract a file into the cache ahead of time, parsing it on the shared process pool."""
+    try:
+        key = await executor.run("io", file_key, file_path, filename)
+        if await executor.run("io", get, key) is not None:
+            return
+        text = await executor.run("extract", file_utils.extract_text, file_path, filename)
+        if text is not None:
+            await executor.run("io", put, key, text)
+    except Exception as e:
+        # Best effort: scoring extracts the file itself on a miss.
+        logger.warning(f"Text cache warm-up failed for {file_path}: {e}")
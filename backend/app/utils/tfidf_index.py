@@ -0,0 +1,212 @@
+"""
+Persistent, incrementally maintained TF-IDF index for one assignment.
+
+The vocabulary and document frequencies live in `assignment_tfidf_index`; each
+submission keeps its raw term counts in `AssignmentSubmission.tfidf_vector`,
+encoded with `vector_codec`.
+IDF weights are applied at query time, so adding a submission only touches the
+terms of the new document instead of refitting a vectorizer on the whole corpus.
+Weights follow sklearn's TfidfVectorizer defaults (smooth idf, l2 norm).
+"""
+import json
+from typing import Optional
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy.orm import Session
+from app import models
+from app.utils import similarity_engine, vector_codec
+
+_analyzer = TfidfVectorizer().build_analyzer()
+# Submissions join the index when they pass the plagiarism checks, which moves them to this status.
+INDEXED_STATUS = "submitted"
+
+def term_counts(text: str) -> dict[str, int]:
+    """Tokenize a document the same way TfidfVectorizer does and count its terms."""
+    counts: dict[str, int] = {}
+    for token in _analyzer(text):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def _l2_normalize(matrix: sparse.spmatrix, extra_sq: Optional[np.ndarray] = None) -> sparse.csr_matrix:
+    """Scale rows to unit l2 norm; extra_sq adds squared weight held outside the matrix."""
+    sq_norms = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+    if extra_sq is not None:
+        sq_norms = sq_norms + extra_sq
+    norms = np.sqrt(sq_norms)
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+class TfidfIndex:
+    """Vocabulary and document frequencies for one assignment's submissions."""
+
+    def __init__(self, record: models.AssignmentTfidfIndex):
+        self.record = record
+        self.vocabulary: dict[str, int] = json.loads(record.vocabulary or "{}")
+        self.doc_freq: list[int] = json.loads(record.doc_freq or "[]")
+        self.n_docs: int = record.n_docs or 0
+
+    def _save(self) -> None:
+        self.record.vocabulary = json.dumps(self.vocabulary)
+        self.record.doc_freq = json.dumps(self.doc_freq)
+        self.record.n_docs = self.n_docs
+
+    def load_vectors(
+        self, db: Session, status: Optional[str] = None, submission_ids: Optional[list[int]] = None
+    ) -> tuple[list[int], sparse.csr_matrix]:
+        """
+        Load the stored term-count rows of this assignment's submissions as a CSR matrix.
+        Raises LookupError if a row predates the index and needs a rebuild.
+        """
+        query = db.query(models.AssignmentSubmission.id, models.AssignmentSubmission.tfidf_vector).filter(
+            models.AssignmentSubmission.assignment_id == self.record.assignment_id
+        )
+        if status is not None:
+            query = query.filter(models.AssignmentSubmission.status == status)
+        if submission_ids is not None:
+            query = query.filter(models.AssignmentSubmission.id.in_(submission_ids))
+
+        return self._matrix(query.order_by(models.AssignmentSubmission.id).all())
+
+    def vectors_of(self, submissions: list[models.AssignmentSubmission]) -> tuple[list[int], sparse.csr_matrix]:
+        """Like load_vectors, but read from the objects, which may hold counts not yet flushed."""
+        return self._matrix([(submission.id, submission.tfidf_vector) for submission in submissions])
+
+    def _matrix(self, rows: list[tuple[int, Optional[bytes]]]) -> tuple[list[int], sparse.csr_matrix]:
+        ids, indptr, indices, data = [], [0], [], []
+        for sub_id, raw in rows:
+            if not vector_codec.is_encoded(raw):
+                raise LookupError(f"Submission {sub_id} is not in the TF-IDF index")
+            row_indices, row_values = vector_codec.decode(raw)
+            ids.append(sub_id)
+            indices.append(row_indices)
+            data.append(row_values)
+            indptr.append(indptr[-1] + len(row_indices))
+
+        matrix = sparse.csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0, dtype=np.float32),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                np.asarray(indptr, dtype=np.int32),
+            ),
+            shape=(len(ids), len(self.doc_freq)),
+        )
+        return ids, matrix
+
+    def weigh(self, documents: list[dict[str, int]], matrix: sparse.csr_matrix) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+        """
+        TF-IDF weight stored rows and new documents as if the vectorizer had been
+        fitted on the indexed documents plus the new ones. Both are l2-normalized.
+        """
+        n_docs = self.n_docs + len(documents)
+        df = np.asarray(self.doc_freq, dtype=np.float64)
+        unknown_df: dict[str, int] = {}
+        unknown_terms: list[list[tuple[str, int]]] = []
+        rows, cols, values = [], [], []
+        for row, counts in enumerate(documents):
+            unknown = []
+            for token, count in counts.items():
+                idx = self.vocabulary.get(token)
+                if idx is None:
+                    unknown_df[token] = unknown_df.get(token, 0) + 1
+                    unknown.append((token, count))
+                else:
+                    df[idx] += 1
+                    rows.append(row)
+                    cols.append(idx)
+                    values.append(count)
+            unknown_terms.append(unknown)
+
+        idf = np.log((1 + n_docs) / (1 + df)) + 1
+        queries = sparse.csr_matrix((values, (rows, cols)), shape=(len(documents), len(df))) @ sparse.diags(idf)
+        # Terms unseen by the index cannot match any stored row but still count
+        # towards the new document's norm.
+        unseen = np.array([
+            sum((count * (np.log((1 + n_docs) / (1 + unknown_df[token])) + 1)) ** 2 for token, count in unknown)
+            for unknown in unknown_terms
+        ])
+        return _l2_normalize(matrix @ sparse.diags(idf)), _l2_normalize(queries, unseen)
+
+    def search(
+        self,
+        documents: list[dict[str, int]],
+        candidate_ids: list[int],
+        matrix: sparse.csr_matrix,
+        k: int = 5,
+        threshold: Optional[float] = None,
+        early_exit: bool = False,
+    ) -> list[list[similarity_engine.Match]]:
+        """Top-k stored submissions for each new document; see similarity_engine.top_k."""
+        candidates, queries = self.weigh(documents, matrix)
+        return similarity_engine.top_k(candidates, candidate_ids, queries, k=k, threshold=threshold, early_exit=early_exit)
+
+    def rebuild(self, db: Session) -> list[models.AssignmentSubmission]:
+        """
+        Recount the index from the content of the assignment's indexed submissions
+        and return them. Nothing is flushed; read their counts back with vectors_of.
+        """
+        self.vocabulary, self.doc_freq, self.n_docs = {}, [], 0
+        submissions = indexed_submissions(db, self.record.assignment_id)
+        for submission in submissions:
+            self.add(submission, term_counts(submission.content or ""))
+        self._save()
+        return submissions
+
+    def add(self, submission: models.AssignmentSubmission, counts: dict[str, int]) -> None:
+        """Add a submission's terms to the index and store its counts on the row."""
+        indexed: dict[int, int] = {}
+        for token, count in counts.items():
+            idx = self.vocabulary.get(token)
+            if idx is None:
+                idx = len(self.doc_freq)
+                self.vocabulary[token] = idx
+                self.doc_freq.append(0)
+            self.doc_freq[idx] += 1
+            indexed[idx] = count
+        self.n_docs += 1
+        term_ids = sorted(indexed)
+        submission.tfidf_vector = vector_codec.encode(term_ids, [indexed[i] for i in term_ids])
+        self._save()
+
+
+def load_index(db: Session, assignment_id: int, for_update: bool = False) -> TfidfIndex:
+    """
+    Fetch (or lazily create) the index record for an assignment. A record created
+    without for_update is not added to the session: only the writer holding the
+    lock creates it, so concurrent jobs of a new assignment don't both insert one.
+    """
+    query = db.query(models.AssignmentTfidfIndex).filter(
+        models.AssignmentTfidfIndex.assignment_id == assignment_id
+    )
+    if for_update:
+        db.flush()
+        query = query.with_for_update().populate_existing()
+    record = query.first()
+    if record is None:
+        record = models.AssignmentTfidfIndex(assignment_id=assignment_id, vocabulary="{}", doc_freq="[]", n_docs=0)
+        if for_update:
+            db.add(record)
+    return TfidfIndex(record)
+
+
+def indexed_submissions(db: Session, assignment_id: int) -> list[models.AssignmentSubmission]:
+    """The submissions of an assignment that belong in its index."""
+    return (
+        db.query(models.AssignmentSubmission)
+        .filter(
+            models.AssignmentSubmission.assignment_id == assignment_id,
+            models.AssignmentSubmission.status == INDEXED_STATUS,
+        )
+        .order_by(models.AssignmentSubmission.id)
+        .all()
+    )
+
+
+def rebuild_index(db: Session, assignment_id: int) -> TfidfIndex:
+    """Re-tokenize the assignment's indexed submissions and rebuild its index from scratch."""
+    index = load_index(db, assignment_id, for_update=True)
+    index.rebuild(db)
+    db.flush()
+    return index
@@ -0,0 +1,147 @@
+"""
+Content-addressed upload storage.
+
+Uploads are streamed to a temporary file in CHUNK_SIZE chunks while their
+SHA-256 is computed, then moved to STORE_DIR/<first two hex digits>/<sha256><ext>.
+An upload whose content is already stored is discarded and the existing blob
+gets another reference, so a file handed in by a whole class is stored once.
+"""
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, NamedTuple, Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models
+from app.utils import executor
+
+STORE_DIR = os.environ.get("UPLOAD_STORE_DIR", "backend/uploads/blobs")
+CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+class StoredFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool  # the content was already in the store
+
+
+def blob_key(sha256: str, filename: str) -> str:
+    # The extension is kept because text extraction dispatches on it.
+    return sha256 + os.path.splitext(filename or "")[1].lower()
+
+
+def blob_path(key: str) -> str:
+    return os.path.join(STORE_DIR, key[:2], key)
+
+
+def stored_sha256(path: str) -> Optional[str]:
+    """The content hash of a file in the store, read from its name; None for files outside it."""
+    if os.path.abspath(os.path.dirname(os.path.dirname(path))) != os.path.abspath(STORE_DIR):
+        return None
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def stream_to_temp(source: BinaryIO, max_bytes: int, chunk_size: int) -> tuple[str, str, int]:
+    """Copy `source` into a temporary file in the store, returning (temp path, sha256, size)."""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := source.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds the upload limit of {max_bytes} bytes",
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def add_reference(db: Session, tmp_path: str, sha256: str, size: int, filename: str) -> StoredFile:
+    """
+    Move a streamed upload into the store (or drop it if the content is there
+    already) and count one more reference to the blob. The reference is part of
+    the caller's transaction: commit it together with the row that records the
+    returned path, so a failed insert never leaves a reference behind.
+    """
+    key = blob_key(sha256, filename)
+    path = blob_path(key)
+    try:
+        # Taking the row lock first means a concurrent release() of the same blob
+        # either finishes deleting it before we re-create it, or sees our reference.
+        updated = (
+            db.query(models.UploadBlob)
+            .filter(models.UploadBlob.key == key)
+            .update({models.UploadBlob.refcount: models.UploadBlob.refcount + 1}, synchronize_session=False)
+        )
+        if not updated:
+            try:
+                with db.begin_nested():
+                    db.add(models.UploadBlob(key=key, sha256=sha256, size=size, refcount=1))
+            except IntegrityError:
+                # Another upload of the same content inserted the row first.
+                db.query(models.UploadBlob).filter(models.UploadBlob.key == key).update(
+                    {models.UploadBlob.refcount: models.UploadBlob.refcount + 1}, synchronize_session=False
+                )
+                updated = 1
+        deduplicated = bool(updated) and os.path.exists(path)
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StoredFile(path=path, sha256=sha256, size=size, deduplicated=deduplicated)
+
+
+class StreamedUpload(NamedTuple):
+    """An upload streamed to a temporary file in the store, not referenced yet."""
+    tmp_path: str
+    sha256: str
+    size: int
+    filename: str
+
+
+async def stream_upload(upload_file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StreamedUpload:
+    """
+    Stream an upload to a temporary file (413 past max_bytes) without touching
+    the database. Store it with add_reference(db, *upload) in the transaction
+    that inserts the row recording its path, or drop it with discard.
+    """
+    tmp_path, sha256, size = await executor.run("io", stream_to_temp, upload_file.file, max_bytes, CHUNK_SIZE)
+    return StreamedUpload(tmp_path, sha256, size, upload_file.filename)
+
+
+def discard(upload: StreamedUpload) -> None:
+    """Remove the temporary file of an upload that never made it into the store."""
+    if os.path.exists(upload.tmp_path):
+        os.remove(upload.tmp_path)
+
+
+def release(db: Session, path: str) -> None:
+    """Drop one reference to the blob at `path`, deleting it when none are left (commits)."""
+    key = os.path.basename(path)
+    db.query(models.UploadBlob).filter(models.UploadBlob.key == key).update(
+        {models.UploadBlob.refcount: models.UploadBlob.refcount - 1}, synchronize_session=False
+    )
+    deleted = (
+        db.query(models.UploadBlob)
+        .filter(models.UploadBlob.key == key, models.UploadBlob.refcount <= 0)
+        .delete(synchronize_session=False)
+    )
+    if deleted and os.path.exists(path):
+        os.remove(path)
+    db.commit()
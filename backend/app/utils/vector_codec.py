@@ -0,0 +1,72 @@
+"""
+Compact binary encoding for sparse vectors stored in BLOB columns.
+
+Layout (little-endian):
+    header   version:u8, flags:u8, pad:2, nnz:u32
+    payload  indices:int32[nnz] followed by values:float32[nnz]
+             (zlib-compressed when FLAG_ZLIB is set)
+
+Uncompressed payloads are decoded with np.frombuffer, so the returned index and
+value arrays are read-only views over the stored bytes rather than copies.
+"""
+import struct
+import zlib
+from typing import Optional
+import numpy as np
+from scipy import sparse
+
+CODEC_VERSION = 1
+FLAG_ZLIB = 0x01
+
+# Rows smaller than this are never compressed: zlib's overhead outweighs the gain.
+COMPRESS_MIN_BYTES = 4096
+
+_HEADER = struct.Struct("<BBxxI")
+_INDEX_DTYPE = np.dtype("<i4")
+_VALUE_DTYPE = np.dtype("<f4")
+
+
+def encode(indices, values, compress: Optional[bool] = None) -> bytes:
+    """
+    Encode parallel index/value arrays. With compress=None the payload is
+    compressed only when it is large enough and zlib actually shrinks it.
+    """
+    indices = np.ascontiguousarray(indices, dtype=_INDEX_DTYPE)
+    values = np.ascontiguousarray(values, dtype=_VALUE_DTYPE)
+    if indices.shape != values.shape:
+        raise ValueError("indices and values must have the same length")
+
+    payload = indices.tobytes() + values.tobytes()
+    flags = 0
+    if compress or (compress is None and len(payload) >= COMPRESS_MIN_BYTES):
+        packed = zlib.compress(payload, 1)
+        if compress or len(packed) < len(payload):
+            payload, flags = packed, FLAG_ZLIB
+    return _HEADER.pack(CODEC_VERSION, flags, len(indices)) + payload
+
+
+def decode(blob: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """Decode a blob into (indices, values) arrays."""
+    view = memoryview(blob)
+    version, flags, nnz = _HEADER.unpack_from(view)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported sparse vector codec version {version}")
+
+    payload = view[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    indices = np.frombuffer(payload, dtype=_INDEX_DTYPE, count=nnz)
+    values = np.frombuffer(payload, dtype=_VALUE_DTYPE, count=nnz, offset=nnz * _INDEX_DTYPE.itemsize)
+    return indices, values
+
+
+def decode_row(blob: bytes, n_cols: int) -> sparse.csr_matrix:
+    """Decode a blob into a 1 x n_cols CSR row sharing the decoded buffers."""
+    indices, values = decode(blob)
+    indptr = np.array([0, len(indices)], dtype=_INDEX_DTYPE)
+    return sparse.csr_matrix((values, indices, indptr), shape=(1, n_cols), copy=False)
+
+
+def is_encoded(raw) -> bool:
+    """True if a stored column value was written by this codec (as opposed to legacy JSON text)."""
+    return isinstance(raw, (bytes, bytearray, memoryview)) and len(raw) >= _HEADER.size and raw[0] == CODEC_VERSION
@@ -0,0 +1,166 @@
+"""
+Benchmark: p50/p99 latency of the sync (threadpool) and async (AsyncSession)
+database paths for the high-traffic read routes under concurrent clients.
+
+The async routes are the app's own /grievance, /messages and
+/student/noc-status; the sync twins run the same queries through a sync
+Session inside a `def` handler, the way those routes did before. Both are
+driven in-process over ASGI against a freshly seeded SQLite database.
+
+Run from backend/:  python -m benchmarks.bench_async_db [--clients 200] [--requests 20]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+_workdir = tempfile.mkdtemp(prefix="bench_async_db_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+
+import httpx  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from sqlalchemy import and_, or_, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app import migrations, models  # noqa: E402
+from app.db import SessionLocal, get_db  # noqa: E402
+from app.dependencies import Principal, get_current_user  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers.auth import create_access_token  # noqa: E402
+
+STUDENTS = 50
+SUBJECTS = 8
+GRIEVANCES_PER_STUDENT = 20
+MESSAGES_PER_PAIR = 50
+
+
+@app.get("/bench/sync/grievance")
+def sync_grievances(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    return [
+        {"id": g.id, "title": g.title, "status": g.status}
+        for g in db.execute(select(models.Grievance).where(models.Grievance.student_id == current_user.id)).scalars()
+    ]
+
+
+@app.get("/bench/sync/messages/{user1_id}/{user2_id}")
+def sync_messages(user1_id: int, user2_id: int, db: Session = Depends(get_db),
+                  current_user: Principal = Depends(get_current_user)):
+    statement = select(models.Message).where(or_(
+        and_(models.Message.sender_id == user1_id, models.Message.receiver_id == user2_id),
+        and_(models.Message.sender_id == user2_id, models.Message.receiver_id == user1_id),
+    )).order_by(models.Message.timestamp.asc())
+    return [{"id": m.id, "content": m.content} for m in db.execute(statement).scalars()]
+
+
+@app.get("/bench/sync/noc-status")
+def sync_noc_status(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    statement = (
+        select(models.StudentSubjectStatus, models.Subject)
+        .join(models.Subject, models.Subject.id == models.StudentSubjectStatus.subject_id)
+        .where(models.StudentSubjectStatus.student_id == current_user.id)
+    )
+    return [
+        {"subject_id": subject.id, "eligible": status.attendance_percentage >= subject.attendance_threshold}
+        for status, subject in db.execute(statement)
+    ]
+
+
+def seed() -> list[tuple[int, str]]:
+    """Migrate the scratch database and synthetic data; returns (user id, access token) per student."""
+    migrations.upgrade()
+    db = SessionLocal()
+    try:
+        subjects = [models.Subject(name=f"Subject {i}", attendance_threshold=75) for i in range(SUBJECTS)]
+        students = [
+            models.User(name=f"Student {i}", email=f"student{i}@bench.local", hashed_password="x",
+                        role=models.UserRole.student, roll_number=f"R{i:04d}")
+            for i in range(STUDENTS)
+        ]
+        db.add_all(subjects + students)
+        db.flush()
+        for i, student in enumerate(students):
+            peer = students[(i + 1) % STUDENTS]
+            db.add_all(
+                models.Grievance(student_id=student.id, title=f"Grievance {n}", description="...")
+                for n in range(GRIEVANCES_PER_STUDENT)
+            )
+            db.add_all(
+                models.Message(sender_id=student.id, receiver_id=peer.id, content=f"Message {n}")
+                for n in range(MESSAGES_PER_PAIR)
+            )
+            db.add_all(
+                models.StudentSubjectStatus(student_id=student.id, subject_id=subject.id,
+                                            attendance_percentage=80.0)
+                for subject in subjects
+            )
+        db.commit()
+        return [
+            (s.id, create_access_token(data={"sub": s.email, "uid": s.id, "role": s.role.value}))
+            for s in students
+        ]
+    finally:
+        db.close()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def drive(client: httpx.AsyncClient, paths: list[tuple[str, str]], clients: int, per_client: int):
+    """`clients` concurrent callers, each issuing `per_client` requests; returns latencies and wall time."""
+    latencies: list[float] = []
+
+    async def caller(worker: int) -> None:
+        for n in range(per_client):
+            path, token = paths[(worker + n) % len(paths)]
+            started = time.perf_counter()
+            response = await client.get(path, headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(worker) for worker in range(clients)))
+    return latencies, time.perf_counter() - started
+
+
+async def run(clients: int, per_client: int) -> None:
+    tokens = seed()
+    routes = {
+        "grievance": (lambda uid: "/bench/sync/grievance", lambda uid: "/grievance"),
+        "messages": (lambda uid: f"/bench/sync/messages/{uid}/{uid % STUDENTS + 1}",
+                     lambda uid: f"/messages/{uid}/{uid % STUDENTS + 1}"),
+        "noc-status": (lambda uid: "/bench/sync/noc-status", lambda uid: "/student/noc-status"),
+    }
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limits) as client:
+        # Warm the principal cache and both connection pools so neither path pays setup costs.
+        await drive(client, [(sync_path(uid), token) for uid, token in tokens
+                             for sync_path, _ in routes.values()], len(tokens), 1)
+        await drive(client, [(async_path(uid), token) for uid, token in tokens
+                             for _, async_path in routes.values()], len(tokens), 1)
+
+        print(f"{clients} concurrent clients x {per_client} requests")
+        print(f"{'route':<12} {'path':<6} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for name, (sync_path, async_path) in routes.items():
+            for label, path_for in (("sync", sync_path), ("async", async_path)):
+                paths = [(path_for(uid), token) for uid, token in tokens]
+                latencies, wall = await drive(client, paths, clients, per_client)
+                print(f"{name:<12} {label:<6} {1000 * percentile(latencies, 50):>8.1f} "
+                      f"{1000 * percentile(latencies, 99):>8.1f} {len(latencies) / wall:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.clients, args.requests))
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: bulk NOC evaluation and export of a whole institute's class.
+
+Seeds a scratch SQLite database with --students students in one class, each
+registered for --subjects subjects with randomized attendance and component
+completion, then times GET /admin/noc-status/export as CSV and NDJSON and
+checks every exported row against noc_eligibility.evaluate.
+
+Run from backend/:  python -m benchmarks.bench_noc_export [--students 5000] [--subjects 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+_workdir = tempfile.mkdtemp(prefix="bench_noc_export_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from app import migrations, models, noc_eligibility  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers.auth import create_access_token  # noqa: E402
+
+
+def seed(n_students: int, n_subjects: int, rng: np.random.Generator) -> str:
+    """Migrate the scratch database and synthetic data; returns an admin access token."""
+    migrations.upgrade()
+    db = SessionLocal()
+    try:
+        admin = models.User(name="Admin", email="admin@bench.local", hashed_password="x", role=models.UserRole.admin)
+        subjects = [
+            models.Subject(name=f"Subject {i}", attendance_threshold=75,
+                           **{rule.required_flag: bool(rng.random() < 0.5) for rule in noc_eligibility.COMPONENT_RULES})
+            for i in range(n_subjects)
+        ]
+        db.add_all([admin] + subjects)
+        db.flush()
+        db.execute(models.User.__table__.insert(), [
+            {"name": f"Student {i}", "email": f"student{i}@bench.local", "hashed_password": "x",
+             "role": models.UserRole.student, "roll_number": f"R{i:05d}", "class_name": "TE", "division": "AB"[i % 2]}
+            for i in range(n_students)
+        ])
+        student_ids = [row[0] for row in db.execute(
+            models.User.__table__.select().with_only_columns(models.User.id).where(models.User.role == models.UserRole.student)
+        )]
+        pairs = [(student_id, subject.id) for student_id in student_ids for subject in subjects]
+        db.execute(models.student_subject.insert(), [{"student_id": s, "subject_id": j} for s, j in pairs])
+        # Status rows for 90% of the pairs; the rest must be evaluated as "nothing completed".
+        completed = rng.random((len(pairs), len(noc_eligibility.COMPONENT_RULES))) < 0.9
+        attendance = rng.uniform(50, 100, len(pairs)).round(1)
+        db.execute(models.StudentSubjectStatus.__table__.insert(), [
+            {"student_id": s, "subject_id": j, "attendance_percentage": float(attendance[n]),
+             **{rule.completed_field: bool(completed[n, k]) for k, rule in enumerate(noc_eligibility.COMPONENT_RULES)}}
+            for n, (s, j) in enumerate(pairs) if n % 10
+        ])
+        db.commit()
+        return create_access_token(data={"sub": admin.email, "uid": admin.id, "role": admin.role.value})
+    finally:
+        db.close()
+
+
+def expected_codes() -> dict[tuple[int, int], list[str]]:
+    db = SessionLocal()
+    try:
+        subjects = {subject.id: subject for subject in db.query(models.Subject)}
+        statuses = {(s.student_id, s.subject_id): s for s in db.query(models.StudentSubjectStatus)}
+        pairs = db.execute(models.student_subject.select()).all()
+        blank = models.StudentSubjectStatus()
+        return {
+            (student_id, subject_id): noc_eligibility.evaluate(
+                statuses.get((student_id, subject_id), blank), subjects[subject_id]).reason_codes
+            for student_id, subject_id in pairs
+        }
+    finally:
+        db.close()
+
+
+async def run(n_students: int, n_subjects: int) -> None:
+    token = seed(n_students, n_subjects, np.random.default_rng(0))
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for fmt in ("csv", "ndjson"):
+            started = time.perf_counter()
+            response = await client.get("/admin/noc-status/export", params={"class_name": "TE", "format": fmt},
+                                        headers=headers)
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            rows = response.text.count("\n") - (fmt == "csv")
+            print(f"{fmt:<7} {rows:>7} rows  {len(response.content) / 1e6:6.1f} MB  {elapsed:6.2f} s")
+            if fmt == "ndjson":
+                exported = {
+                    (record["student_id"], record["subject_id"]): record["reason_codes"]
+                    for record in map(json.loads, response.text.splitlines())
+                }
+                expected = expected_codes()
+                mismatches = sum(exported.get(pair) != codes for pair, codes in expected.items())
+                print(f"checked {len(expected)} rows against evaluate(): {mismatches} mismatches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--subjects", type=int, default=8)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.students, args.subjects))
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+fp32 vs. dynamically quantized int8 MiniLM on CPU: latency, throughput, memory
+and drift of similarity scores on a fixed reference corpus.
+
+Each precision runs in a fresh process, so its resident memory (RSS growth from
+before the model load to after the timed runs) is not skewed by the other
+model's allocations. The size of the saved state_dict is reported separately.
+
+Run from backend/:  python -m benchmarks.bench_quantization [--threads N]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+import numpy as np
+import torch
+from app.utils import bert_utils
+
+# (submission, teacher sample) pairs spanning near-copies, paraphrases and unrelated text.
+REFERENCE_PAIRS = [
+    ("Photosynthesis converts light energy into chemical energy stored in glucose.",
+     "Plants use photosynthesis to turn sunlight into chemical energy in the form of glucose."),
+    ("The French Revolution began in 1789 and ended the absolute monarchy.",
+     "In 1789 the French Revolution started, bringing the absolute monarchy to an end."),
+    ("A linked list stores elements in nodes that point to the next node.",
+     "Arrays keep elements in contiguous memory and allow constant-time indexing."),
+    ("Newton's second law states that force equals mass times acceleration.",
+     "According to Newton, the net force on a body is its mass multiplied by its acceleration."),
+    ("Supply and demand determine the market price of a good.",
+     "The mitochondria is the powerhouse of the cell."),
+    ("TCP provides reliable, ordered delivery of a byte stream between applications.",
+     "UDP is a connectionless protocol that does not guarantee delivery or ordering."),
+    ("Binary search runs in logarithmic time on a sorted array.",
+     "On a sorted array, binary search finds an element in O(log n) comparisons."),
+    ("Shakespeare wrote Hamlet, a tragedy about the prince of Denmark.",
+     "Hamlet, the Danish prince, is the protagonist of Shakespeare's tragedy."),
+    ("Climate change is driven largely by greenhouse gas emissions from fossil fuels.",
+     "Burning fossil fuels releases greenhouse gases that warm the planet."),
+    ("Normalization in databases reduces redundancy by splitting tables.",
+     "Photosynthesis converts light energy into chemical energy stored in glucose."),
+    ("The derivative of a function measures its instantaneous rate of change.",
+     "Integration computes the area under a curve."),
+    ("Object-oriented programming organizes code around objects and classes.",
+     "Classes and objects are the core building blocks of object-oriented programming."),
+]
+
+
+def serialized_bytes(model) -> int:
+    """Size of the model's state_dict as torch.save writes it (the on-disk size, not memory)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def rss_bytes() -> int:
+    """Current resident set size; where /proc is missing, the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def measure(loaded, texts: list[str], batch_size: int, repeat: int) -> dict:
+    bert_utils.embed_batch(texts[:1], loaded=loaded)  # warm up
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            started = time.perf_counter()
+            bert_utils.embed_batch([text], loaded=loaded)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(0, len(texts), batch_size):
+            bert_utils.embed_batch(texts[i:i + batch_size], loaded=loaded)
+    throughput = repeat * len(texts) / (time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        "throughput": throughput,
+    }
+
+
+def pair_scores(loaded) -> np.ndarray:
+    first = bert_utils.embed_batch([a for a, _ in REFERENCE_PAIRS], loaded=loaded)
+    second = bert_utils.embed_batch([b for _, b in REFERENCE_PAIRS], loaded=loaded)
+    return (first * second).sum(dim=1).numpy()
+
+
+def run(precision: str, threads, batch_size: int, repeat: int) -> tuple[dict, np.ndarray]:
+    """Load and measure one precision; meant to run in its own process."""
+    if threads:
+        torch.set_num_threads(threads)
+    texts = [text for pair in REFERENCE_PAIRS for text in pair]
+    # Imported before the baseline so the RSS growth is the model's, not the library's.
+    from transformers import AutoModel, AutoTokenizer  # noqa: F401
+    rss_before = rss_bytes()
+    tokenizer, model, timings = bert_utils.load_model(quantize=None if precision == "fp32" else precision)
+    loaded = (tokenizer, model)
+    result = measure(loaded, texts, batch_size, repeat)
+    result.update({
+        "rss_mb": (rss_bytes() - rss_before) / 2**20,
+        "serialized_mb": serialized_bytes(model) / 2**20,
+        "load_s": timings["load_s"],
+    })
+    return result, pair_scores(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results, scores = {}, {}
+    context = multiprocessing.get_context("spawn")
+    for precision in ("fp32", "int8"):
+        with context.Pool(1) as pool:
+            results[precision], scores[precision] = pool.apply(
+                run, (precision, args.threads, args.batch_size, args.repeat)
+            )
+
+    print(f"{'':6} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>9} {'RSS MB':>8} {'saved MB':>9} {'load s':>7}")
+    for precision, r in results.items():
+        print(f"{precision:6} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['throughput']:>9.1f} "
+              f"{r['rss_mb']:>8.1f} {r['serialized_mb']:>9.1f} {r['load_s']:>7.2f}")
+
+    drift = np.abs(scores["int8"] - scores["fp32"])
+    print(f"\nCosine score drift over {len(REFERENCE_PAIRS)} reference pairs:")
+    print(f"  mean |Δ| = {drift.mean():.4f}   max |Δ| = {drift.max():.4f}   "
+          f"correlation = {np.corrcoef(scores['fp32'], scores['int8'])[0, 1]:.4f}")
+    for (a, _), fp32, int8 in zip(REFERENCE_PAIRS, scores["fp32"], scores["int8"]):
+        print(f"  {fp32:.3f} -> {int8:.3f}  {a[:60]}")
+
+
+if __name__ == "__main__":
+    main()
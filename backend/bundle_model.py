@@ -0,0 +1,19 @@
+"""
+Download the sentence-embedding model once and save it as a local safetensors
+bundle, so workers load it from disk (memory-mapped) without touching the network.
+
+    python bundle_model.py [target_dir]
+"""
+import sys
+from transformers import AutoTokenizer, AutoModel
+from app.utils import bert_utils
+
+def bundle_model(target_dir=bert_utils.MODEL_DIR):
+    tokenizer = AutoTokenizer.from_pretrained(bert_utils.MODEL_NAME)
+    model = AutoModel.from_pretrained(bert_utils.MODEL_NAME)
+    tokenizer.save_pretrained(target_dir)
+    model.save_pretrained(target_dir, safe_serialization=True)
+    print(f"Saved {bert_utils.MODEL_NAME} to {target_dir}")
+
+if __name__ == "__main__":
+    bundle_model(*sys.argv[1:])
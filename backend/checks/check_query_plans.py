@@ -0,0 +1,181 @@
+"""
+Check that the hot lookups are served by indexes.
+
+Migrates a scratch SQLite database to head, seeds it, runs EXPLAIN QUERY PLAN
+on the queries the routers and workers issue, and exits non-zero if any plan
+contains a full table or index scan or does not use the index the query is
+expected to be served by.
+
+Run from backend/:  python -m checks.check_query_plans
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+_workdir = tempfile.mkdtemp(prefix="query_plans_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'plans.db')}"
+
+from sqlalchemy import and_, or_, select  # noqa: E402
+from app import migrations, models  # noqa: E402
+from app.db import SessionLocal, engine  # noqa: E402
+
+STUDENTS = 300
+TEACHERS = 20
+SUBJECTS = 30
+# "SCAN <table>" reads every row; SEARCH, temp B-trees and constant rows are fine.
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+USED_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\S+)|USING (INTEGER PRIMARY KEY)")
+PRIMARY_KEY = "INTEGER PRIMARY KEY"
+
+
+def seed() -> None:
+    db = SessionLocal()
+    try:
+        subjects = [models.Subject(name=f"Subject {i}") for i in range(SUBJECTS)]
+        teachers = [
+            models.User(name=f"Teacher {i}", email=f"teacher{i}@plans.local", hashed_password="x",
+                        role=models.UserRole.teacher)
+            for i in range(TEACHERS)
+        ]
+        students = [
+            models.User(name=f"Student {i}", email=f"student{i}@plans.local", hashed_password="x",
+                        role=models.UserRole.student, roll_number=f"R{i:04d}")
+            for i in range(STUDENTS)
+        ]
+        db.add_all(subjects + teachers + students)
+        db.flush()
+        for i, subject in enumerate(subjects):
+            db.execute(models.teacher_subject.insert().values(
+                teacher_id=teachers[i % TEACHERS].id, subject_id=subject.id))
+            db.execute(models.student_subject.insert(), [
+                {"student_id": student.id, "subject_id": subject.id} for student in students[i::3]
+            ])
+        assignments = [
+            models.Assignment(title=f"Assignment {i}", subject_id=subjects[i % SUBJECTS].id,
+                              teacher_id=teachers[i % TEACHERS].id, deadline=datetime(2030, 1, 1),
+                              is_sample=i % 10 == 0)
+            for i in range(SUBJECTS * 4)
+        ]
+        db.add_all(assignments)
+        db.flush()
+        for i, student in enumerate(students):
+            db.add_all(
+                models.AssignmentSubmission(assignment_id=assignment.id, student_id=student.id, content="...",
+                                            file_path=f"{student.id}-{assignment.id}.pdf", status="submitted")
+                for assignment in assignments[i % 7::17]
+            )
+            db.add_all(
+                models.StudentSubjectStatus(student_id=student.id, subject_id=subject.id)
+                for subject in subjects[i % 3::3]
+            )
+            db.add_all(models.Grievance(student_id=student.id, title="...", description="...") for _ in range(3))
+            db.add_all(
+                models.Message(sender_id=student.id, receiver_id=students[(i + n) % STUDENTS].id, content="...")
+                for n in range(1, 6)
+            )
+        db.commit()
+    finally:
+        db.close()
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+
+def queries():
+    """
+    (label, expected index or indexes, statement) for each lookup the application
+    issues, with representative parameters.
+    """
+    return [
+        ("auth: user by id", PRIMARY_KEY, select(models.User).where(models.User.id == 7)),
+        ("auth: user by email", "ix_users_email", select(models.User).where(models.User.email == "student7@plans.local")),
+        ("auth: refresh token", "sqlite_autoindex_auth_sessions_1", select(models.AuthSession).where(models.AuthSession.token_hash == "ab" * 32)),
+        ("auth: reused refresh token", "ix_auth_sessions_previous_token_hash", select(models.AuthSession).where(
+            models.AuthSession.previous_token_hash == "ab" * 32, models.AuthSession.revoked_at.is_(None))),
+        ("auth: sessions of user", "ix_auth_sessions_user_id", select(models.AuthSession).where(models.AuthSession.user_id == 7)),
+        ("admin: users by role", "ix_users_role_roll_number", select(models.User).where(models.User.role == models.UserRole.teacher)),
+        ("assignment: subject by name", "sqlite_autoindex_subjects_1", select(models.Subject).where(models.Subject.name == "Subject 3")),
+        ("assignment: teacher's assignments", "ix_assignments_teacher_id", select(models.Assignment).where(models.Assignment.teacher_id == 3)),
+        ("assignment: teacher teaches subject", "ix_teacher_subject_subject_teacher", select(models.teacher_subject).where(
+            models.teacher_subject.c.teacher_id == 3, models.teacher_subject.c.subject_id == 4)),
+        ("assignment: student takes subject", "ix_student_subject_subject_student", select(models.student_subject).where(
+            models.student_subject.c.student_id == 40, models.student_subject.c.subject_id == 4)),
+        ("assignment: export submissions", ("ix_assignment_submissions_assignment_student", PRIMARY_KEY), select(
+            models.AssignmentSubmission.id, models.AssignmentSubmission.file_path, models.User.roll_number,
+        ).join(models.User, models.User.id == models.AssignmentSubmission.student_id).where(
+            models.AssignmentSubmission.assignment_id == 5, models.AssignmentSubmission.file_path.isnot(None),
+        ).order_by(models.AssignmentSubmission.id)),
+        ("assignment: student's submission", "ix_assignment_submissions_assignment_student", select(models.AssignmentSubmission).where(
+            models.AssignmentSubmission.assignment_id == 5, models.AssignmentSubmission.student_id == 40)),
+        ("assignment: submissions of student", "ix_assignment_submissions_student_id", select(models.AssignmentSubmission).where(
+            models.AssignmentSubmission.student_id == 40)),
+        ("assignment: scoring job of submission", "ix_scoring_jobs_submission_id", select(models.ScoringJob).where(
+            models.ScoringJob.submission_id == 12).order_by(models.ScoringJob.id.desc()).limit(1)),
+        ("bulk: students by roll number", "ix_users_role_roll_number", select(models.User.roll_number, models.User.id).where(
+            models.User.role == models.UserRole.student, models.User.roll_number.in_(["R0001", "R0002"]))),
+        ("scoring: teacher sample of subject", "ix_assignments_subject_id", select(models.Assignment).where(
+            models.Assignment.subject_id == 4, models.Assignment.is_sample == True).limit(1)),  # noqa: E712
+        ("scoring: claim next job", "ix_scoring_jobs_status_assignment", select(models.ScoringJob.id).where(
+            models.ScoringJob.status == "queued",
+        ).order_by(models.ScoringJob.id).limit(5)),
+        ("tfidf: submissions of assignment", "ix_assignment_submissions_assignment_student", select(
+            models.AssignmentSubmission.id, models.AssignmentSubmission.tfidf_vector,
+        ).where(models.AssignmentSubmission.assignment_id == 5)),
+        ("tfidf: submissions indexed since a check", "ix_assignment_submissions_assignment_student", select(
+            models.AssignmentSubmission.id,
+        ).where(models.AssignmentSubmission.assignment_id == 5, models.AssignmentSubmission.status == "submitted",
+                models.AssignmentSubmission.id.notin_([1, 2, 3]))),
+        ("minhash: bands by bucket", "ix_minhash_bands_bucket_subject", select(models.MinHashBand.submission_id).where(
+            models.MinHashBand.bucket.in_([1, 2, 3]), models.MinHashBand.subject_id == 4)),
+        ("messages: conversation", "ix_messages_conversation", select(models.Message).where(or_(
+            and_(models.Message.sender_id == 7, models.Message.receiver_id == 8),
+            and_(models.Message.sender_id == 8, models.Message.receiver_id == 7),
+        )).order_by(models.Message.timestamp.asc())),
+        ("grievance: student's grievances", "ix_grievances_student_id", select(models.Grievance).where(models.Grievance.student_id == 40)),
+        ("noc: student's NOC status", "ix_student_subject_status_student_subject", select(
+            models.StudentSubjectStatus.subject_id, models.StudentSubjectStatus.is_noc_eligible,
+            models.StudentSubjectStatus.noc_ineligibility_reason,
+        ).where(models.StudentSubjectStatus.student_id == 40)),
+        ("marks/status: student's subject status", "ix_student_subject_status_student_subject", select(models.StudentSubjectStatus).where(
+            models.StudentSubjectStatus.student_id == 40, models.StudentSubjectStatus.subject_id == 4)),
+        ("subject: statuses of subject", "ix_student_subject_status_subject_id", select(models.StudentSubjectStatus).where(
+            models.StudentSubjectStatus.subject_id == 4)),
+        ("sce: teacher's subjects", "ix_teacher_subject_teacher_subject", select(models.teacher_subject.c.subject_id).where(
+            models.teacher_subject.c.teacher_id == 3)),
+        ("upload store: blob by key", "sqlite_autoindex_upload_blobs_1", select(models.UploadBlob).where(models.UploadBlob.key == "ab.pdf")),
+        ("text cache: extracted text", "sqlite_autoindex_extracted_texts_1", select(models.ExtractedText.text).where(
+            models.ExtractedText.key == "ab.pdf", models.ExtractedText.extractor_version == 1)),
+    ]
+
+
+def check() -> list[str]:
+    failures = []
+    with engine.connect() as connection:
+        for label, expected, statement in queries():
+            sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            scans = [step for step in plan if FULL_SCAN.match(step)]
+            used = {name for step in plan for match in USED_INDEX.findall(step) for name in match if name}
+            missing = [name for name in ((expected,) if isinstance(expected, str) else expected) if name not in used]
+            print(f"{'FAIL' if scans or missing else 'ok  '}  {label}: {'; '.join(plan)}")
+            if scans:
+                failures.append(f"{label}: {'; '.join(scans)}")
+            if missing:
+                failures.append(f"{label}: does not use {', '.join(missing)}")
+    return failures
+
+
+if __name__ == "__main__":
+    try:
+        migrations.upgrade()
+        seed()
+        failures = check()
+    finally:
+        engine.dispose()
+        shutil.rmtree(_workdir, ignore_errors=True)
+    if failures:
+        print(f"\n{len(failures)} plans scan a whole table or miss their index:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nAll queries are served by indexes.")
@@ -0,0 +1,211 @@
+"""
+Run scoring jobs end to end through scoring_worker.process_job.
+
+Migrates a scratch SQLite database to head, seeds a subject with a teacher
+sample and a few submissions, then claims and processes their jobs the way a
+worker thread does. The BERT forward pass is replaced by a deterministic stub,
+so no model download is needed; everything else (text extraction, plagiarism
+checks, index updates, the embedding cache and the job queue) is the real code
+on the real schema. Exits non-zero if a job ends in the wrong state, its
+results were not cached, the model ran while the job held the write lock, a
+stale index was rebuilt with the wrong document counts, or a rejected upload
+kept its blob reference.
+
+Run from backend/:  python -m checks.check_scoring_job
+"""
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+_workdir = tempfile.mkdtemp(prefix="scoring_job_")
+_database = os.path.join(_workdir, "scoring.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database}"
+os.environ["UPLOAD_STORE_DIR"] = os.path.join(_workdir, "blobs")
+
+import numpy as np  # noqa: E402
+import scoring_worker  # noqa: E402
+from app import migrations, models  # noqa: E402
+from app.db import SessionLocal, engine  # noqa: E402
+from app.utils import bert_utils, embedding_cache, job_queue, tfidf_index, upload_store  # noqa: E402
+
+EMBEDDING_DIM = 32
+SAMPLE_TEXT = "Photosynthesis converts light energy into chemical energy stored in glucose."
+SAMPLE_FILE_TEXT = SAMPLE_TEXT + " Oxygen is released as a by-product."
+ORIGINAL_TEXT = "Plants capture sunlight in chloroplasts and use it to build sugars from carbon dioxide and water."
+# submission label -> (content, expected submission status); jobs run in this order,
+# so "copy" is checked against the already scored "original" of the same assignment.
+SUBMISSIONS = {
+    "original": (ORIGINAL_TEXT, "submitted"),
+    "different": ("Mitochondria release energy from glucose through cellular respiration.", "submitted"),
+    "copy": (ORIGINAL_TEXT, "rejected"),
+}
+# Handed in as files rather than typed content; both upload the same bytes, so they
+# share one blob, which must drop back to a single reference once the copy is rejected.
+FILE_SUBMISSIONS = ("original", "copy")
+# A submission that predates the TF-IDF index, and a new one to the same assignment
+# whose job has to rebuild the index without counting itself twice.
+LEGACY_TEXT = "Enzymes lower the activation energy of reactions inside the cell."
+LATE_TEXT = "Ribosomes translate messenger RNA into chains of amino acids."
+
+
+# Forward passes that ran while a job held the database write lock.
+locked_forward_passes = []
+
+
+def database_is_writable() -> bool:
+    connection = sqlite3.connect(_database, timeout=0)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.rollback()
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def stub_embed_batch(texts: list[str], loaded=None):
+    """Stands in for the model: a unit vector seeded by the text, so equal texts embed equally."""
+    import torch
+
+    if not database_is_writable():
+        locked_forward_passes.append(texts)
+    rows = [
+        np.random.default_rng(int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little"))
+        .standard_normal(EMBEDDING_DIM).astype(np.float32)
+        for text in texts
+    ]
+    vectors = torch.from_numpy(np.stack(rows))
+    return vectors / vectors.norm(dim=1, keepdim=True)
+
+
+def store_text(db, text: str, filename: str) -> str:
+    tmp_path, sha256, size = upload_store.stream_to_temp(
+        io.BytesIO(text.encode("utf-8")), upload_store.MAX_UPLOAD_BYTES, upload_store.CHUNK_SIZE
+    )
+    return upload_store.add_reference(db, tmp_path, sha256, size, filename).path
+
+
+def seed() -> dict[str, int]:
+    """
+    Create the subject, its teacher sample, one assignment and one with an
+    unindexed submission; returns submission ids by label ("late" for the latter).
+    """
+    db = SessionLocal()
+    try:
+        subject = models.Subject(name="Biology")
+        teacher = models.User(name="Teacher", email="teacher@scoring.local", hashed_password="x",
+                              role=models.UserRole.teacher)
+        students = [
+            models.User(name=f"Student {i}", email=f"student{i}@scoring.local", hashed_password="x",
+                        role=models.UserRole.student, roll_number=f"R{i:04d}")
+            for i in range(len(SUBMISSIONS))
+        ]
+        db.add_all([subject, teacher, *students])
+        db.flush()
+        sample = models.Assignment(title="Sample answer", subject_id=subject.id, teacher_id=teacher.id,
+                                   deadline=datetime(2030, 1, 1), is_sample=True, description=SAMPLE_TEXT,
+                                   assignment_file_path=store_text(db, SAMPLE_FILE_TEXT, "sample.txt"))
+        assignment = models.Assignment(title="Energy in cells", subject_id=subject.id, teacher_id=teacher.id,
+                                       deadline=datetime(2030, 1, 1))
+        db.add_all([sample, assignment])
+        db.flush()
+        submissions = {}
+        for student, (label, (content, _)) in zip(students, SUBMISSIONS.items()):
+            if label in FILE_SUBMISSIONS:
+                submission = models.AssignmentSubmission(assignment_id=assignment.id, student_id=student.id,
+                                                         content="", file_path=store_text(db, content, f"{label}.txt"),
+                                                         status="scoring")
+            else:
+                submission = models.AssignmentSubmission(assignment_id=assignment.id, student_id=student.id,
+                                                         content=content, status="scoring")
+            db.add(submission)
+            db.flush()
+            job_queue.enqueue(db, submission)
+            submissions[label] = submission.id
+        legacy = models.Assignment(title="Enzymes", subject_id=subject.id, teacher_id=teacher.id,
+                                   deadline=datetime(2030, 1, 1))
+        db.add(legacy)
+        db.flush()
+        db.add(models.AssignmentSubmission(assignment_id=legacy.id, student_id=students[0].id,
+                                           content=LEGACY_TEXT, status="submitted"))
+        late = models.AssignmentSubmission(assignment_id=legacy.id, student_id=students[1].id,
+                                           content=LATE_TEXT, status="scoring")
+        db.add(late)
+        db.flush()
+        job_queue.enqueue(db, late)
+        submissions["late"] = late.id
+        db.commit()
+        return submissions
+    finally:
+        db.close()
+
+
+def run_jobs(submissions: dict[str, int]) -> list[str]:
+    failures = []
+    db = SessionLocal()
+    try:
+        expectations = [(label, expected) for label, (_, expected) in SUBMISSIONS.items()] + [("late", "submitted")]
+        for label, expected in expectations:
+            job = job_queue.claim_next(db, "check")
+            if job is None:
+                failures.append(f"{label}: no job to claim")
+                continue
+            scoring_worker.process_job(db, job)
+            submission = db.get(models.AssignmentSubmission, submissions[label])
+            db.refresh(job)
+            print(f"{label}: job {job.status} ({job.detail or 'no detail'}), submission {submission.status}, "
+                  f"bert_score {submission.bert_score}")
+            if job.status != job_queue.DONE or submission.status != expected:
+                failures.append(f"{label}: job {job.status}, submission {submission.status} (expected {expected})")
+            elif expected == "submitted" and submission.bert_score is None:
+                failures.append(f"{label}: no bert_score")
+
+        late = db.get(models.AssignmentSubmission, submissions["late"])
+        index = tfidf_index.load_index(db, late.assignment_id)
+        expected_df = {}
+        for text in (LEGACY_TEXT, LATE_TEXT):
+            for token in tfidf_index.term_counts(text):
+                expected_df[token] = expected_df.get(token, 0) + 1
+        rebuilt_df = {token: index.doc_freq[idx] for token, idx in index.vocabulary.items()}
+        print(f"rebuilt index: {index.n_docs} documents, {len(rebuilt_df)} terms")
+        if index.n_docs != 2 or rebuilt_df != expected_df:
+            failures.append(f"rebuilt index counts {index.n_docs} documents, expected the legacy and late ones once each")
+
+        cached = db.query(models.EmbeddingCacheEntry.key).count()
+        # The sample plus the three distinct scored texts; the rejected copy is never embedded.
+        print(f"embedding cache rows: {cached}, in-process: {embedding_cache.cache.stats()}")
+        if cached != 4:
+            failures.append(f"embedding cache holds {cached} rows, expected 4")
+        if locked_forward_passes:
+            failures.append(f"{len(locked_forward_passes)} forward passes ran under the job's write lock")
+        texts = sorted(text for (text,) in db.query(models.ExtractedText.text))
+        print(f"extracted text rows: {len(texts)}")
+        if texts != sorted([SAMPLE_FILE_TEXT, ORIGINAL_TEXT]):
+            failures.append(f"text cache holds {texts!r}, expected the sample's and the uploaded submissions' text")
+        refcounts = sorted(refcount for (refcount,) in db.query(models.UploadBlob.refcount))
+        print(f"upload blob references: {refcounts}")
+        if refcounts != [1, 1]:
+            failures.append(f"upload blobs hold {refcounts} references, expected the sample's and the original's")
+    finally:
+        db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    bert_utils.embed_batch = stub_embed_batch
+    try:
+        migrations.upgrade()
+        failures = run_jobs(seed())
+    finally:
+        engine.dispose()
+        shutil.rmtree(_workdir, ignore_errors=True)
+    if failures:
+        print(f"\n{len(failures)} checks failed:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nAll jobs were scored and cached as expected.")
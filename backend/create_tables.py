@@ -1,8 +1,8 @@
-from app.db import engine
-from app.models import Base
+from app import migrations
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    # Tables are created by the Alembic migrations; see migrate.py.
+    migrations.upgrade()
     print("Tables created successfully.")
 
 if __name__ == "__main__":
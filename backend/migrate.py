@@ -0,0 +1,17 @@
+import argparse
+from app import migrations
+
+def migrate(revision="head", stamp=None):
+    if stamp:
+        migrations.stamp(stamp)
+        print(f"Stamped database at revision {stamp}.")
+    migrations.upgrade(revision)
+    print(f"Database schema is at revision {migrations.current_revision()}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or upgrade the database schema through Alembic migrations.")
+    parser.add_argument("revision", nargs="?", default="head")
+    parser.add_argument("--stamp", metavar="REVISION",
+                        help="first mark an existing unversioned database as already at REVISION")
+    args = parser.parse_args()
+    migrate(args.revision, args.stamp)
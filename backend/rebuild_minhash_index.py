@@ -0,0 +1,15 @@
+import sys
+from app.db import SessionLocal
+from app.utils import minhash_index
+
+def rebuild_minhash_index(assignment_ids=None):
+    db = SessionLocal()
+    try:
+        count = minhash_index.rebuild(db, assignment_ids or None)
+        db.commit()
+        print(f"Indexed MinHash signatures for {count} submissions.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_minhash_index([int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,14 @@
+from app.db import SessionLocal
+from app import noc_eligibility
+
+def rebuild_noc_eligibility():
+    db = SessionLocal()
+    try:
+        count = noc_eligibility.rebuild(db)
+        db.commit()
+        print(f"Re-evaluated NOC eligibility; {count} student-subject rows changed.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_noc_eligibility()
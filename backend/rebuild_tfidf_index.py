@@ -0,0 +1,19 @@
+import sys
+from app import models
+from app.db import SessionLocal
+from app.utils import tfidf_index
+
+def rebuild_tfidf_index(assignment_ids=None):
+    db = SessionLocal()
+    try:
+        if not assignment_ids:
+            assignment_ids = [a_id for (a_id,) in db.query(models.Assignment.id).all()]
+        for assignment_id in assignment_ids:
+            index = tfidf_index.rebuild_index(db, assignment_id)
+            db.commit()
+            print(f"Assignment {assignment_id}: indexed {index.n_docs} submissions, {len(index.doc_freq)} terms.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_tfidf_index([int(arg) for arg in sys.argv[1:]])
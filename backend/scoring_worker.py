@@ -0,0 +1,120 @@
+"""
+Scoring worker pool. Run alongside the API server:
+
+    python scoring_worker.py --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from app import migrations, models, scoring
+from app.db import SessionLocal
+from app.utils import bert_utils, embedding_batcher, embedding_cache, job_queue, text_cache, upload_store
+
+logger = logging.getLogger("scoring_worker")
+
+
+def process_job(db, job: models.ScoringJob) -> None:
+    submission = db.query(models.AssignmentSubmission).get(job.submission_id)
+    # New cache entries are written after the job's own transaction commits.
+    with embedding_cache.cache.deferred_writes(), text_cache.deferred_writes():
+        try:
+            scoring.score_submission(db, submission)
+            job_queue.finish(db, job)
+        except scoring.SubmissionRejected as e:
+            db.rollback()  # drop any partial index updates
+            submission.status = "rejected"
+            job_queue.finish(db, job, detail=str(e))
+            if submission.file_path:
+                # Rejected work is never scored or compared again; free its upload (commits).
+                path, submission.file_path = submission.file_path, None
+                upload_store.release(db, path)
+        except Exception as e:
+            logger.error(f"Scoring job {job.id} failed: {e}", exc_info=True)
+            db.rollback()
+            job_queue.fail(db, job, repr(e))
+            if job.status == job_queue.FAILED:
+                submission.status = "error"
+        db.commit()
+
+
+def run_job_loop(name: str, poll_interval: float) -> None:
+    db = SessionLocal()
+    try:
+        while True:
+            job = job_queue.claim_next(db, name)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            started = time.perf_counter()
+            process_job(db, job)
+            logger.info(
+                f"{name}: job {job.id} -> {job.status} in {time.perf_counter() - started:.2f}s "
+                f"(embedding cache: {embedding_cache.cache.stats()}, batcher: {bert_utils.batcher.stats()})"
+            )
+    finally:
+        db.close()
+
+
+def run_worker(name: str, poll_interval: float, warm_model: bool = True, threads: int = 1) -> None:
+    """
+    One worker process. Its job threads share a single model copy; concurrent
+    embedding calls are coalesced into batched forward passes by bert_utils.batcher.
+    """
+    if embedding_batcher.NUM_THREADS:
+        import torch
+        # Process-wide: every forward pass in this worker process uses this many threads.
+        torch.set_num_threads(embedding_batcher.NUM_THREADS)
+    if warm_model:
+        logger.info(f"{name}: model warmed {bert_utils.warm()}")
+    job_threads = [
+        threading.Thread(target=run_job_loop, args=(f"{name}.{t}", poll_interval), daemon=True)
+        for t in range(threads)
+    ]
+    for thread in job_threads:
+        thread.start()
+    for thread in job_threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scoring workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds to sleep when the queue is empty")
+    parser.add_argument("--threads", type=int, default=4, help="job threads per worker process")
+    parser.add_argument("--warm-model", action=argparse.BooleanOptionalAction, default=True,
+                        help="load the BERT model before taking jobs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    migrations.verify_schema()
+
+    def spawn(i):
+        name = f"{socket.gethostname()}-{os.getpid()}-{i}"
+        process = multiprocessing.Process(target=run_worker, args=(name, args.poll_interval, args.warm_model, args.threads), name=name, daemon=True)
+        process.start()
+        return process
+
+    workers = [spawn(i) for i in range(args.workers)]
+    logger.info(f"Started {len(workers)} scoring workers")
+    db = SessionLocal()
+    try:
+        while True:
+            requeued = job_queue.requeue_expired(db)
+            if requeued:
+                logger.warning(f"Re-queued {requeued} jobs with expired leases")
+            for i, process in enumerate(workers):
+                if not process.is_alive():
+                    logger.warning(f"Worker {process.name} exited with code {process.exitcode}; restarting")
+                    workers[i] = spawn(i)
+            time.sleep(job_queue.LEASE_SECONDS / 10)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()